@@ -1,6 +1,6 @@
 from langgraph.graph import StateGraph, END
 from app.agent.state import AgentState
-from app.agent.nodes import parse_resume, search_jobs, analyze_fit, submit_application, apply_browser
+from app.agent.nodes import parse_resume, search_jobs, dedupe_jobs, rank_jobs, analyze_fit, submit_application, write_cover_letters, apply_browser
 
 def create_graph():
     workflow = StateGraph(AgentState)
@@ -8,31 +8,37 @@ def create_graph():
     # Add nodes
     workflow.add_node("parse_resume", parse_resume)
     workflow.add_node("search_jobs", search_jobs)
+    workflow.add_node("dedupe_jobs", dedupe_jobs)
+    workflow.add_node("rank_jobs", rank_jobs)
     workflow.add_node("analyze_fit", analyze_fit)
     workflow.add_node("submit_application", submit_application)
+    workflow.add_node("write_cover_letters", write_cover_letters)
     workflow.add_node("apply_browser", apply_browser)
     
     # Define edges
     workflow.set_entry_point("parse_resume")
     workflow.add_edge("parse_resume", "search_jobs")
-    workflow.add_edge("search_jobs", "analyze_fit")
+    workflow.add_edge("search_jobs", "dedupe_jobs")
+    workflow.add_edge("dedupe_jobs", "rank_jobs")
+    workflow.add_edge("rank_jobs", "analyze_fit")
     workflow.add_edge("analyze_fit", "submit_application")
     
-    # Decide whether to go to apply_browser or END
+    # Decide whether to go on to auto-apply (cover letters first) or END
     def should_continue(state):
         if state.get("auto_apply") and state.get("applications_submitted"):
-            return "apply_browser"
+            return "write_cover_letters"
         return END
 
     workflow.add_conditional_edges(
         "submit_application",
         should_continue,
         {
-            "apply_browser": "apply_browser",
+            "write_cover_letters": "write_cover_letters",
             END: END
         }
     )
     
+    workflow.add_edge("write_cover_letters", "apply_browser")
     workflow.add_edge("apply_browser", END)
     
     return workflow.compile()
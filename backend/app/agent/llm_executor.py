@@ -0,0 +1,143 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from langchain_core.runnables import Runnable
+
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+DEFAULT_RPM = float(os.getenv("LLM_RPM", "60"))
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Rate limits, server errors, timeouts and malformed model output are worth
+    retrying. Other client errors (bad key, bad request) are not.
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return True
+
+class LLMExecutor:
+    """
+    Shared execution layer for LLM calls of one provider: caps in-flight requests,
+    paces them with a token bucket and retries transient failures with
+    exponential backoff and jitter.
+    """
+    _executors: Dict[str, "LLMExecutor"] = {}
+
+    def __init__(self, provider: str, max_in_flight: int, requests_per_minute: float):
+        self.provider = provider
+        self.max_in_flight = max_in_flight
+        self.requests_per_minute = requests_per_minute
+        # asyncio primitives bind to a loop lazily, so these are created on first use
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+    @classmethod
+    def for_provider(cls, provider: str) -> "LLMExecutor":
+        if provider not in cls._executors:
+            env = provider.upper()
+            cls._executors[provider] = cls(
+                provider,
+                max_in_flight=int(os.getenv(f"LLM_MAX_IN_FLIGHT_{env}", MAX_IN_FLIGHT)),
+                requests_per_minute=float(os.getenv(f"LLM_RPM_{env}", DEFAULT_RPM)),
+            )
+        return cls._executors[provider]
+
+    def _limits(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            rate = self.requests_per_minute / 60.0
+            self._bucket = TokenBucket(rate=rate, capacity=max(1.0, float(self.max_in_flight)))
+        return self._semaphore, self._bucket
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    async def invoke(self, chain: Runnable, inputs: Dict[str, Any], on_dispatch: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Runs one chain invocation under the provider's limits, retrying transient errors.
+        on_dispatch is called once, when the first attempt gets its slot and token.
+        """
+        semaphore, bucket = self._limits()
+        attempt = 0
+        while True:
+            async with semaphore:
+                await bucket.acquire()
+                if attempt == 0 and on_dispatch:
+                    on_dispatch()
+                try:
+                    return await chain.ainvoke(inputs)
+                except Exception as e:
+                    if attempt >= MAX_RETRIES or not is_retryable(e):
+                        raise
+                    delay = self._backoff(attempt)
+                    print(f"LLM[{self.provider}] attempt {attempt + 1} failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def batch(self, chain: Runnable, inputs: List[Dict[str, Any]]) -> List[Union[Any, Exception]]:
+        """
+        Like chain.abatch, but each item is limited and retried on its own, and a
+        failure is returned in that item's slot instead of failing the whole batch.
+        """
+        return await asyncio.gather(*(self.invoke(chain, i) for i in inputs), return_exceptions=True)
+
+    async def stream(self, chain: Runnable, inputs: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Streams chunks under the provider's limits. Retries only happen before the
+        first chunk has been yielded.
+        """
+        semaphore, bucket = self._limits()
+        attempt = 0
+        while True:
+            started = False
+            async with semaphore:
+                await bucket.acquire()
+                try:
+                    async for chunk in chain.astream(inputs):
+                        started = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    if started or attempt >= MAX_RETRIES or not is_retryable(e):
+                        raise
+                    delay = self._backoff(attempt)
+                    print(f"LLM[{self.provider}] stream attempt {attempt + 1} failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+def llm_executor(provider: str) -> LLMExecutor:
+    return LLMExecutor.for_provider(provider)
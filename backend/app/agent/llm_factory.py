@@ -1,9 +1,62 @@
 import os
+import asyncio
+import threading
+import httpx
+from typing import Dict, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_ollama import ChatOllama
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+# Chat models are stateless between calls and safe to share, so one instance per
+# provider/model is kept for the life of the process. Each keeps its HTTP
+# connection pool, so repeat calls reuse warm keep-alive connections.
+_clients: Dict[Tuple[str, str], object] = {}
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+_clients_lock = threading.Lock()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "120"))
+WARMUP_PROVIDERS = [p.strip() for p in os.getenv("LLM_WARMUP_PROVIDERS", "gemini").split(",") if p.strip()]
+
+DEFAULT_MODELS = {
+    "ollama": "llama3",
+    "gemini": "gemini-flash-latest",
+    "openrouter": "openai/gpt-oss-120b:free",
+    "openai": "gpt-4o",
+}
+
+def _pooled_http_client(base_url: str) -> httpx.AsyncClient:
+    """
+    One pooled async HTTP client per OpenAI-compatible endpoint, shared by every model on it.
+    """
+    if base_url not in _http_clients:
+        _http_clients[base_url] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _http_clients[base_url]
+
 def get_llm(model_type: str = "openai", model_name: str = None):
+    """
+    Returns the shared LLM instance for this provider/model, creating it on first use.
+    """
+    if model_type not in DEFAULT_MODELS:
+        model_type = "openai"
+    key = (model_type, model_name or DEFAULT_MODELS[model_type])
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _build_llm(*key)
+                _clients[key] = client
+    return client
+
+def _build_llm(model_type: str = "openai", model_name: str = None):
     """
     Factory to return an LLM instance.
     model_type: "openai" or "ollama"
@@ -27,6 +80,7 @@ def get_llm(model_type: str = "openai", model_name: str = None):
             temperature=0,
             base_url="https://openrouter.ai/api/v1",
             api_key=api_key,
+            http_async_client=_pooled_http_client("https://openrouter.ai/api/v1"),
             model_kwargs={"extra_body": {"reasoning": {"enabled": True}}},
             default_headers={
                 "HTTP-Referer": "http://localhost:5173",
@@ -41,4 +95,42 @@ def get_llm(model_type: str = "openai", model_name: str = None):
              # Fallback or error - for now log a warning? 
              # Or maybe just return it and let it fail if used?
              pass
-        return ChatOpenAI(model=name, temperature=0)
+        return ChatOpenAI(model=name, temperature=0, http_async_client=_pooled_http_client("https://api.openai.com/v1"))
+
+async def _warm_up_one(model_type: str):
+    llm = get_llm(model_type=model_type)
+    # A cheap metadata request is enough to open the TLS connection into the pool
+    if model_type == "gemini":
+        await llm.client.aio.models.get(model=llm.model)
+    elif model_type in ("openai", "openrouter"):
+        await llm.root_async_client.models.list()
+
+async def warm_up_llms(timeout: float = 10.0):
+    """
+    Builds the configured providers' clients at startup and opens their connections.
+    Failures are logged, never fatal.
+    """
+    for model_type in WARMUP_PROVIDERS:
+        try:
+            await asyncio.wait_for(_warm_up_one(model_type), timeout=timeout)
+            print(f"LLM client warmed up: {model_type}")
+        except Exception as e:
+            print(f"LLM warm-up failed for {model_type}: {e}")
+
+async def close_llm_clients():
+    """
+    Closes the pooled connections at shutdown: the shared httpx clients of the
+    OpenAI-compatible models and each Gemini model's own google-genai client.
+    """
+    for (model_type, _), llm in list(_clients.items()):
+        if model_type != "gemini":
+            continue
+        try:
+            await llm.client.aio.aclose()
+            llm.client.close()
+        except Exception as e:
+            print(f"Failed to close {model_type} client: {e}")
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+    _clients.clear()
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from langchain_core.runnables import Runnable
+
+from app.agent.llm_factory import get_llm
+from app.agent.llm_executor import llm_executor
+
+# Tasks the app routes separately; each can have its own provider order and hedge deadline
+RESUME_PARSING = "resume_parsing"
+FIT_SCORING = "fit_scoring"
+COVER_LETTER = "cover_letter"
+FORM_MAPPING = "form_mapping"
+
+DEFAULT_ROUTE = ["gemini", "openrouter"]
+DEFAULT_HEDGE_SECONDS = {
+    RESUME_PARSING: 20.0,
+    FIT_SCORING: 15.0,
+    COVER_LETTER: 30.0,
+    FORM_MAPPING: 10.0,
+}
+# Providers that need an API key are skipped when it isn't configured
+PROVIDER_KEYS = {
+    "gemini": "GOOGLE_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+    "openai": "OPENAI_API_KEY",
+}
+
+STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "100"))
+MIN_SAMPLES = 10
+UNHEALTHY_ERROR_RATE = float(os.getenv("LLM_UNHEALTHY_ERROR_RATE", "0.5"))
+# p95s are compared in buckets this wide so jitter doesn't reshuffle the configured order
+LATENCY_BUCKET_SECONDS = float(os.getenv("LLM_LATENCY_BUCKET_SECONDS", "1.0"))
+
+ChainBuilder = Callable[[Any], Runnable]
+
+class ProviderStats:
+    """
+    Rolling window of (latency seconds, ok) per provider.
+    """
+    def __init__(self, window: int = STATS_WINDOW):
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        self.samples.append((latency, ok))
+
+    def _latencies(self) -> List[float]:
+        return sorted(latency for latency, ok in self.samples if ok)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        latencies = self._latencies()
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def healthy(self) -> bool:
+        return len(self.samples) < MIN_SAMPLES or self.error_rate < UNHEALTHY_ERROR_RATE
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "error_rate": round(self.error_rate, 3),
+        }
+
+class LLMRouter:
+    """
+    Picks a provider per task, hedges a slow request to the next provider after a
+    deadline and fails over when a provider errors. Route order per task comes
+    from LLM_ROUTE_<TASK> (comma separated), the hedge deadline from
+    LLM_HEDGE_<TASK> seconds.
+    """
+    def __init__(self):
+        self.stats: Dict[str, ProviderStats] = {}
+
+    def _stats(self, provider: str) -> ProviderStats:
+        if provider not in self.stats:
+            self.stats[provider] = ProviderStats()
+        return self.stats[provider]
+
+    def _p95_bucket(self, provider: str) -> float:
+        stats = self._stats(provider)
+        p95 = stats.percentile(95)
+        if p95 is None or len(stats.samples) < MIN_SAMPLES:
+            # Unknown latency: behind providers we have numbers for, in configured order
+            return float("inf")
+        return round(p95 / LATENCY_BUCKET_SECONDS)
+
+    def route(self, task: str) -> List[str]:
+        configured = os.getenv(f"LLM_ROUTE_{task.upper()}")
+        providers = [p.strip() for p in configured.split(",")] if configured else list(DEFAULT_ROUTE)
+        providers = [p for p in providers if p and (p not in PROVIDER_KEYS or os.getenv(PROVIDER_KEYS[p]))] or providers[:1]
+        # Unhealthy providers go to the back rather than out, so something is always tried;
+        # among the rest the faster p95 leads (stable sort: ties keep the configured order)
+        return sorted(providers, key=lambda p: (not self._stats(p).healthy, self._p95_bucket(p)))
+
+    def hedge_deadline(self, task: str, provider: str) -> float:
+        configured = os.getenv(f"LLM_HEDGE_{task.upper()}")
+        if configured:
+            return float(configured)
+        default = DEFAULT_HEDGE_SECONDS.get(task, 20.0)
+        # Once we know the provider, hedge at its p95 (within sane bounds)
+        p95 = self._stats(provider).percentile(95)
+        if p95 is None or len(self._stats(provider).samples) < MIN_SAMPLES:
+            return default
+        return min(max(p95, 2.0), default)
+
+    async def _attempt(self, provider: str, build: ChainBuilder, inputs: Dict[str, Any],
+                       on_dispatch: Optional[Callable[[], None]] = None) -> Any:
+        # The clock starts once the executor sends the request: time queued behind
+        # its concurrency cap and rate limit is our backlog, not provider latency
+        started: Optional[float] = None
+
+        def dispatched():
+            nonlocal started
+            started = time.monotonic()
+            if on_dispatch:
+                on_dispatch()
+
+        try:
+            result = await llm_executor(provider).invoke(build(get_llm(model_type=provider)), inputs, on_dispatch=dispatched)
+        except asyncio.CancelledError:
+            # Usually lost a hedge: it took at least this long, and leaving it out
+            # would keep only the fast samples and drag the p95 (and deadline) down.
+            # An attempt cancelled while still queued says nothing about the provider.
+            if started is not None:
+                self._stats(provider).record(time.monotonic() - started, True)
+            raise
+        except Exception:
+            self._stats(provider).record(time.monotonic() - started if started is not None else 0.0, False)
+            raise
+        self._stats(provider).record(time.monotonic() - started, True)
+        return result
+
+    async def invoke(self, task: str, build: ChainBuilder, inputs: Dict[str, Any]) -> Any:
+        """
+        build(llm) must return the runnable to execute for that provider's model.
+        """
+        providers = self.route(task)
+        running: Dict[asyncio.Task, str] = {}
+        errors: List[str] = []
+        next_index = 0
+        dispatched_at: Dict[str, float] = {}
+        dispatch = asyncio.Event()
+
+        def launch():
+            nonlocal next_index
+            provider = providers[next_index]
+            next_index += 1
+
+            def on_dispatch():
+                dispatched_at[provider] = time.monotonic()
+                dispatch.set()
+
+            running[asyncio.create_task(self._attempt(provider, build, inputs, on_dispatch))] = provider
+
+        launch()
+        try:
+            while running:
+                # While there is a provider left to hedge to, only wait until the deadline,
+                # counted from when the latest attempt was actually sent
+                timeout = deadline = None
+                waiter = None
+                if next_index < len(providers):
+                    current = providers[next_index - 1]
+                    if current in dispatched_at:
+                        deadline = self.hedge_deadline(task, current)
+                        timeout = max(0.0, deadline - (time.monotonic() - dispatched_at[current]))
+                    else:
+                        # Still queued in the executor: no deadline until it is sent
+                        dispatch.clear()
+                        waiter = asyncio.create_task(dispatch.wait())
+                done, _ = await asyncio.wait(
+                    set(running) | ({waiter} if waiter else set()), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if waiter:
+                    waiter.cancel()
+                    done.discard(waiter)
+
+                if not done and timeout is None:
+                    continue
+                if not done:
+                    print(f"LLM router: {task} on {providers[next_index - 1]} exceeded {deadline:.1f}s, hedging to {providers[next_index]}")
+                    launch()
+                    continue
+
+                for finished in done:
+                    provider = running.pop(finished)
+                    if finished.exception() is None:
+                        return finished.result()
+                    errors.append(f"{provider}: {finished.exception()}")
+                    print(f"LLM router: {task} failed on {provider}: {finished.exception()}")
+
+                if not running and next_index < len(providers):
+                    launch()
+        finally:
+            for pending in running:
+                pending.cancel()
+
+        raise RuntimeError(f"All providers failed for {task}: {'; '.join(errors)}")
+
+    async def batch(self, task: str, build: ChainBuilder, inputs: List[Dict[str, Any]]) -> List[Union[Any, Exception]]:
+        """
+        Routes each item independently; failures come back in their item's slot.
+        """
+        return await asyncio.gather(*(self.invoke(task, build, i) for i in inputs), return_exceptions=True)
+
+    async def stream(self, task: str, build: ChainBuilder, inputs: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Streams from the first provider that starts producing output. Fails over only
+        before the first chunk; no hedging, since two streams can't be merged.
+        """
+        errors: List[str] = []
+        for provider in self.route(task):
+            started = time.monotonic()
+            produced = False
+            try:
+                async for chunk in llm_executor(provider).stream(build(get_llm(model_type=provider)), inputs):
+                    produced = True
+                    yield chunk
+                self._stats(provider).record(time.monotonic() - started, True)
+                return
+            except Exception as e:
+                self._stats(provider).record(time.monotonic() - started, False)
+                if produced:
+                    raise
+                errors.append(f"{provider}: {e}")
+                print(f"LLM router: {task} stream failed on {provider}: {e}")
+        raise RuntimeError(f"All providers failed for {task}: {'; '.join(errors)}")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {provider: stats.summary() for provider, stats in self.stats.items()}
+
+llm_router = LLMRouter()
@@ -1,13 +1,18 @@
 from app.agent.state import AgentState, Job
-from app.agent.llm_factory import get_llm
+from app.agent.llm_router import llm_router, RESUME_PARSING, FIT_SCORING, COVER_LETTER
 from langchain_core.prompts import ChatPromptTemplate
 from typing import List
+import asyncio
 import json
 import random
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 
 from app.services.job_search import JobSearchService
+from app.services.job_dedup import JobDedupService
+from app.services.fit_cache import FitScoreCache
+from app.services.job_ranker import JobRanker, PREFILTER_TOP_K
 from app.services.browser_apply import BrowserApplyService
+from app.services.resume_chunker import ResumeChunker, RESUME_PARSE_TOKEN_BUDGET
 
 async def parse_resume(state: AgentState):
     """
@@ -24,9 +29,13 @@ async def parse_resume(state: AgentState):
             "logs": state.get("logs", []) + ["No resume found to parse."]
         }
 
+    # Summary and skills of this exact resume are already known
+    if state.get("resume_summary") and state.get("extracted_skills"):
+        return {
+            "logs": state.get("logs", []) + [f"Resume already parsed: {len(state['extracted_skills'])} skills found."]
+        }
+
     try:
-        # Use Gemini
-        llm = get_llm(model_type="gemini")
         parser = JsonOutputParser()
         
         prompt = ChatPromptTemplate.from_messages([
@@ -34,10 +43,10 @@ async def parse_resume(state: AgentState):
             ("user", "Resume Content:\n{resume_text}\n\nExtract Summary and Skills:")
         ])
         
-        chain = prompt | llm | parser
+        build_chain = lambda llm: prompt | llm | parser
         
-        response = await chain.ainvoke({
-            "resume_text": resume_content[:5000]
+        response = await llm_router.invoke(RESUME_PARSING, build_chain, {
+            "resume_text": ResumeChunker.pack(resume_content, token_budget=RESUME_PARSE_TOKEN_BUDGET)
         })
         
         summary = response.get("summary", "")
@@ -75,25 +84,116 @@ async def search_jobs(state: AgentState):
     exp_levels = prefs.experience_level if prefs else ["Intermediate"]
     job_types = prefs.job_type if prefs else ["Full-time"]
     
-    # Construct a more specific search term
+    # Construct a more specific search term per role
     # Example: "Senior Software Engineer Full-time"
-    base_role = query_roles[0] if query_roles else "Software Engineer"
+    roles = [r for r in query_roles if r] or ["Software Engineer"]
     exp = exp_levels[0] if exp_levels else ""
     jtype = job_types[0] if job_types else ""
     
-    search_query = f"{exp} {base_role} {jtype}".strip()
-    search_loc = location[0] if location else "Remote"
+    search_queries = [f"{exp} {role} {jtype}".strip() for role in roles]
+    search_locs = [l for l in location if l] or ["Remote"]
     
-    print(f"Searching for: '{search_query}' in '{search_loc}'")
+    print(f"Searching for: {search_queries} in {search_locs}")
     
-    # Call Real Service
-    jobs = JobSearchService.search_jobs(search_query, search_loc, posted_within_days=days)
+    # Call Real Service (scrapes run off the event loop, one task per site/query/location)
+    jobs = await JobSearchService.search_jobs_async(search_queries, search_locs, posted_within_days=days)
     
     return {
         "found_jobs": jobs, 
-        "logs": state.get("logs", []) + [f"Found {len(jobs)} jobs for '{search_query}' in '{search_loc}'"]
+        "logs": state.get("logs", []) + [f"Found {len(jobs)} jobs for {search_queries} in {search_locs}"]
+    }
+
+async def dedupe_jobs(state: AgentState):
+    """
+    Collapses the same posting scraped from several boards and drops jobs the
+    user already had scored recently against the same resume and preferences,
+    so analyze_fit doesn't pay for them.
+    """
+    jobs = state.get("found_jobs", [])
+    if not jobs:
+        return {"found_jobs": jobs}
+
+    unique_jobs = JobDedupService.dedupe(jobs)
+    try:
+        new_jobs = await asyncio.to_thread(
+            JobDedupService.filter_unscored, state.get("user_id"), unique_jobs, _scoring_context(state)
+        )
+    except Exception as e:
+        print(f"Dedup index lookup failed: {e}")
+        new_jobs = unique_jobs
+
+    return {
+        "found_jobs": new_jobs,
+        "logs": state.get("logs", []) + [
+            f"Deduplicated {len(jobs)} jobs to {len(unique_jobs)} unique, {len(new_jobs)} not previously scored"
+        ]
+    }
+
+async def rank_jobs(state: AgentState):
+    """
+    Local first pass: scores jobs on resume skill overlap and BM25 and keeps only
+    the top PREFILTER_TOP_K for LLM analysis.
+    """
+    jobs = state.get("found_jobs", [])
+    if len(jobs) <= PREFILTER_TOP_K:
+        return {"found_jobs": jobs}
+
+    prefs = state.get("preferences")
+    shortlist, rejected = await asyncio.to_thread(
+        JobRanker.shortlist,
+        jobs,
+        state.get("extracted_skills", []),
+        [r for r in prefs.role if r] if prefs else [],
+        prefs.experience_level if prefs else [],
+        prefs.job_type if prefs else [],
+    )
+
+    return {
+        "found_jobs": shortlist,
+        "logs": state.get("logs", []) + [
+            f"Pre-ranked {len(jobs)} jobs locally, sending top {len(shortlist)} to analysis ({len(rejected)} discarded)"
+        ]
+    }
+
+FIT_PROMPT_ID = "analyze_fit/v2"
+
+def _fit_criteria(prefs) -> dict:
+    return {
+        "Desired Experience Level": ", ".join(prefs.experience_level) if prefs else "Not specified",
+        "Desired Job Type": ", ".join(prefs.job_type) if prefs else "Not specified",
+        "Desired Roles": ", ".join(prefs.role) if prefs else "Not specified"
+    }
+
+def _min_match_score(prefs) -> int:
+    return prefs.min_match_score if prefs and hasattr(prefs, 'min_match_score') else 70
+
+def _scoring_context(state: AgentState) -> str:
+    prefs = state.get("preferences")
+    return JobDedupService.scoring_context(
+        state.get("resume_summary", ""), _fit_criteria(prefs), _min_match_score(prefs)
+    )
+
+def normalize_fit_result(result: dict) -> dict:
+    """
+    Coerces an LLM fit response into {"score" (0-1), "explanation"}. Everything
+    written to FitScoreCache goes through here.
+    """
+    score_val = result.get("score", 0.5)
+    try:
+        s = float(score_val)
+        if s > 1.0: s = s / 100.0
+        score = min(max(s, 0.0), 1.0)
+    except:
+        score = 0.5
+    return {
+        "score": score,
+        "explanation": result.get("explanation", "No explanation provided.")
     }
 
+def _apply_fit_result(job: dict, result: dict):
+    job["fit_score"] = result["score"]
+    job["explanation"] = result.get("explanation")
+
 async def analyze_fit(state: AgentState):
     """
     Analyzes the fit of ALL found jobs using an LLM in batch.
@@ -106,16 +206,26 @@ async def analyze_fit(state: AgentState):
     prefs = state.get("preferences")
     
     # Extract criteria string for the LLM
-    criteria = {
-        "Desired Experience Level": ", ".join(prefs.experience_level) if prefs else "Not specified",
-        "Desired Job Type": ", ".join(prefs.job_type) if prefs else "Not specified",
-        "Desired Roles": ", ".join(prefs.role) if prefs else "Not specified"
-    }
+    criteria = _fit_criteria(prefs)
     criteria_str = json.dumps(criteria, indent=2)
 
+    # Reuse results for jobs already scored against this exact resume summary and criteria
+    cache_keys = [FitScoreCache.make_key(FIT_PROMPT_ID, resume_summary, job, criteria) for job in jobs]
+    cached = await asyncio.to_thread(FitScoreCache.get_many, cache_keys)
+    
+    new_logs = []
+    pending = []
+    for job, key in zip(jobs, cache_keys):
+        if key in cached:
+            _apply_fit_result(job, cached[key])
+            new_logs.append(f"Analyzed {job['title']}: {job['fit_score']:.2f} (cached)")
+        else:
+            pending.append((job, key))
+    new_logs.append(f"Fit cache: {len(cached)} hits, {len(pending)} misses")
+    
     # Prepare batch inputs
     inputs = []
-    for job in jobs:
+    for job, _ in pending:
         inputs.append({
             "job_title": job.get("title", ""),
             "company": job.get("company", ""),
@@ -124,42 +234,41 @@ async def analyze_fit(state: AgentState):
             "user_preferences": criteria_str
         })
     
-    new_logs = []
-    
-    # Use Gemini
+    # Provider is picked per call by the router (Gemini first by default)
     try:
-        llm = get_llm(model_type="gemini")
         parser = JsonOutputParser()
         
         prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a world class career assistant. Analyze the fit between the candidate's resume, their specific job preferences, and the job description. \n\nUser Preferences:\n{user_preferences}\n\nStrictly penalize matches where the job seniority (e.g. Senior vs Junior) or job type (e.g. Contract vs Full-time) does not align with the user preferences. Return a JSON object with three keys: 'score' (between 0 and 1), 'explanation' (one paragraph string justifying the score based on skills AND preferences), and 'cover_letter' (a professional, customized cover letter text)."),
+            ("system", "You are a world class career assistant. Analyze the fit between the candidate's resume, their specific job preferences, and the job description. \n\nUser Preferences:\n{user_preferences}\n\nStrictly penalize matches where the job seniority (e.g. Senior vs Junior) or job type (e.g. Contract vs Full-time) does not align with the user preferences. Return a JSON object with two keys: 'score' (between 0 and 1) and 'explanation' (two or three sentences justifying the score based on skills AND preferences)."),
             ("user", "Job: {job_title} at {company}\nDescription: {description}\n\nResume Summary: {resume_summary}\n\nAnalyze fit and return a structured output in JSON format:")
         ])
         
-        chain = prompt | llm | parser
+        build_chain = lambda llm: prompt | llm | parser
         
-        print(f"Analyzing {len(inputs)} jobs in batch...")
-        results = await chain.abatch(inputs)
+        print(f"Analyzing {len(inputs)} jobs in batch ({len(cached)} cached)...")
+        results = await llm_router.batch(FIT_SCORING, build_chain, inputs)
         
-        # Map results back to jobs
-        for i, result in enumerate(results):
-            score_val = result.get("score", 0.5)
-            try:
-                s = float(score_val)
-                if s > 1.0: s = s / 100.0
-                score = s
-            except:
-                score = 0.5
-                
-            explanation = result.get("explanation", "No explanation provided.")
-            cover_letter = result.get("cover_letter", "")
-            
-            # Update the job in the list
-            jobs[i]["fit_score"] = score
-            jobs[i]["cover_letter"] = cover_letter
-            new_logs.append(f"Analyzed {jobs[i]['title']}: {score:.2f}")
+        # Map results back to jobs; a failed item leaves its job unscored (and unrecorded)
+        # so it is picked up again on the next run
+        fresh_results = {}
+        failed_keys = set()
+        for (job, key), result in zip(pending, results):
+            if isinstance(result, Exception):
+                print(f"LLM Error for {job['title']}: {result}")
+                new_logs.append(f"Error analyzing {job['title']}: {result}")
+                failed_keys.add(key)
+                continue
+            fresh_results[key] = normalize_fit_result(result)
+            _apply_fit_result(job, fresh_results[key])
+            new_logs.append(f"Analyzed {job['title']}: {job['fit_score']:.2f}")
+        
+        await asyncio.to_thread(FitScoreCache.put_many, fresh_results)
+
+        # Recorded by the run's save step, once the applications are persisted too
+        scored_jobs = [job for job, key in zip(jobs, cache_keys) if key not in failed_keys]
 
     except Exception as e:
+        scored_jobs = []
         print(f"LLM Error: {e}. Check GOOGLE_API_KEY in .env.")
         new_logs.append(f"Error analyzing jobs: {e}")
         for job in jobs:
@@ -168,6 +277,8 @@ async def analyze_fit(state: AgentState):
 
     return {
         "found_jobs": jobs, 
+        "scored_jobs": scored_jobs,
+        "scoring_context": _scoring_context(state),
         "application_status": "analyzing",
         "logs": state.get("logs", []) + new_logs
     }
@@ -181,7 +292,7 @@ async def submit_application(state: AgentState):
         return {"application_status": "completed", "logs": state.get("logs", [])}
     
     prefs = state.get("preferences")
-    min_score = prefs.min_match_score if prefs and hasattr(prefs, 'min_match_score') else 70
+    min_score = _min_match_score(prefs)
     
     current_submitted = state.get("applications_submitted", [])
     new_submitted = []
@@ -202,6 +313,59 @@ async def submit_application(state: AgentState):
         "logs": state.get("logs", []) + new_logs
     }
 
+def cover_letter_chain(llm):
+    """
+    Cover letters are generated separately from scoring, only for jobs we actually
+    apply to. Returns plain text so it can be streamed.
+    """
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a world class career assistant. Write a professional, customized cover letter for the candidate and job below. Return only the letter text."),
+        ("user", "Job: {job_title} at {company}\nDescription: {description}\n\nResume Summary: {resume_summary}\n\nWhy the candidate fits: {explanation}\n\nCover letter:")
+    ])
+    return prompt | llm | StrOutputParser()
+
+def cover_letter_input(job_title: str, company: str, description: str, resume_summary: str, explanation: str = None) -> dict:
+    return {
+        "job_title": job_title or "",
+        "company": company or "",
+        "description": description or "",
+        "resume_summary": resume_summary or "",
+        "explanation": explanation or "Not analyzed."
+    }
+
+async def write_cover_letters(state: AgentState):
+    """
+    Generates cover letters for the jobs that passed the threshold, ahead of auto-apply.
+    Without auto-apply, letters are generated on demand per Application instead.
+    """
+    submitted = set(state.get("applications_submitted", []))
+    jobs = [j for j in state.get("found_jobs", []) if j["url"] in submitted and not j.get("cover_letter")]
+    if not jobs:
+        return {"found_jobs": state.get("found_jobs", [])}
+
+    resume_summary = state.get("resume_summary", "")
+    try:
+        letters = await llm_router.batch(COVER_LETTER, cover_letter_chain, [
+            cover_letter_input(j.get("title"), j.get("company"), j.get("description"), resume_summary, j.get("explanation"))
+            for j in jobs
+        ])
+        written = 0
+        for job, letter in zip(jobs, letters):
+            if isinstance(letter, Exception):
+                print(f"Cover Letter Error for {job['title']}: {letter}")
+                continue
+            job["cover_letter"] = letter
+            written += 1
+        log_msg = f"Wrote {written} of {len(jobs)} cover letters"
+    except Exception as e:
+        print(f"Cover Letter Error: {e}")
+        log_msg = f"Error writing cover letters: {e}"
+
+    return {
+        "found_jobs": state.get("found_jobs", []),
+        "logs": state.get("logs", []) + [log_msg]
+    }
+
 async def apply_browser(state: AgentState):
     """
     Autonomous browser application node.
@@ -224,23 +388,14 @@ async def apply_browser(state: AgentState):
     # Only apply to jobs in 'submitted_urls' that aren't already applied in DB?
     # (Actually, endpoints.py handles DB sync from state['applications_submitted'])
     # We should only apply to 'newly' submitted ones.
-    
-    for job_url in submitted_urls:
-        job = next((j for j in found_jobs if j["url"] == job_url), None)
-        if not job: continue
-        
-        print(f"Auto-Applying to {job['title']}...")
-        result = await BrowserApplyService.apply_to_job(
-            job_url=job["url"],
-            profile=profile,
-            resume_bytes=resume_bytes,
-            resume_filename=resume_filename,
-            cover_letter=job.get("cover_letter")
-        )
-        
+    jobs_by_url = {j["url"]: j for j in found_jobs}
+    jobs = [jobs_by_url[url] for url in submitted_urls if url in jobs_by_url]
+
+    # Concurrent, capped globally and per host; logged in completion order
+    async for job, result in BrowserApplyService.apply_many(jobs, profile, resume_bytes, resume_filename):
         if result["status"] == "success":
             new_logs.append(f"Successfully auto-filled {job['title']} at {job['company']}")
-            applied_successfully.append(job_url)
+            applied_successfully.append(job["url"])
         else:
             new_logs.append(f"Auto-apply failed for {job['title']}: {result['message']}")
 
@@ -9,7 +9,11 @@ class Job(TypedDict):
     url: str
     source: str # "api", "mock", "linkedin_scrape"
     fit_score: Optional[float]
-    cover_letter: Optional[str]
+    explanation: Optional[str]
+    cover_letter: Optional[str] # Only written for jobs we apply to
+    canonical_url: Optional[str] # Set by dedupe_jobs
+    fingerprint: Optional[str] # Set by dedupe_jobs
+    local_score: Optional[float] # Set by rank_jobs
 
 class AgentState(TypedDict):
     resume: str
@@ -20,6 +24,8 @@ class AgentState(TypedDict):
     preferences: JobPreference
     profile: Optional[Profile]
     found_jobs: List[Job]
+    scored_jobs: List[Job] # Scored by analyze_fit, recorded with the applications when the run is saved
+    scoring_context: Optional[str] # See JobDedupService.scoring_context
     current_job: Optional[Job]
     application_status: str # "searching", "analyzing", "applying", "completed"
     applications_submitted: List[str] # List of job URLs
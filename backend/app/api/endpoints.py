@@ -1,82 +1,113 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from app.models import Resume, JobPreference, User, Application, Profile
-from app.database import get_session
-from typing import List
+from app.models import Resume, JobPreference, User, Application, Profile, AgentRun
+from app.database import get_session, get_async_session, async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional, Tuple
 from app.services.resume_parser import ResumeService
 from app.services.job_search import JobSearchService
-from app.agent.graph import agent_graph
+from app.services.fit_cache import FitScoreCache
+from app.services.form_mapping_cache import FormMappingCache
+from app.services.agent_runs import AgentRunService
+from app.services.blob_store import BlobStore
+from app.services.passwords import PasswordHasher
+from app.services.auth import AuthTokens, UserCache, AUTH_ALLOW_EMAIL_HEADER, AUTH_ALLOW_SOCIAL_PLACEHOLDER
+from app.services.resume_chunker import ResumeChunker
+from app.agent.nodes import cover_letter_chain, cover_letter_input, normalize_fit_result
 from datetime import datetime
+import asyncio
 import json
-from app.agent.llm_factory import get_llm
+import os
+from app.agent.llm_router import llm_router, FIT_SCORING, COVER_LETTER
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-import bcrypt
-import hashlib
 
 router = APIRouter()
 
-def hash_password(password: str):
-    # Bcrypt has a 72-byte limit. 
-    # Standard practice: hash the password with SHA256 first to allow unlimited length.
-    pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    
-    # Pre-hash with SHA256
-    digest = hashlib.sha256(pwd_bytes).hexdigest().encode('utf-8')
-    
-    hashed = bcrypt.hashpw(digest, salt)
-    return hashed.decode('utf-8')
+async def get_identity(
+    session: AsyncSession = Depends(get_async_session),
+    authorization: str = Header(None),
+    x_user_email: str = Header(None)
+) -> Tuple[User, Optional[Profile]]:
+    """
+    Resolves the caller from a signed bearer token (or the X-User-Email header,
+    if AUTH_ALLOW_EMAIL_HEADER is turned on for a migration). Served from UserCache when possible; on a miss user and
+    profile come back in one query.
+    """
+    user_id, email = None, None
+    if authorization and authorization.lower().startswith("bearer "):
+        user_id = AuthTokens.verify(authorization[7:].strip())
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+    elif x_user_email and AUTH_ALLOW_EMAIL_HEADER:
+        email = x_user_email
+    else:
+        raise HTTPException(status_code=401, detail="Authentication required")
 
-def verify_password(plain_password: str, hashed_password: str):
-    # Re-calculate digest and verify
-    digest = hashlib.sha256(plain_password.encode('utf-8')).hexdigest().encode('utf-8')
-    return bcrypt.checkpw(digest, hashed_password.encode('utf-8'))
+    cached = UserCache.get(user_id=user_id, email=email)
+    if cached:
+        return cached
 
-# Helper to get user from email header
-def get_current_user(session: Session = Depends(get_session), x_user_email: str = Header(None)):
-    if not x_user_email:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    user = session.exec(select(User).where(User.email == x_user_email)).first()
-    if not user:
+    condition = User.id == user_id if user_id is not None else User.email == email
+    row = (await session.exec(
+        select(User, Profile).outerjoin(Profile, Profile.user_id == User.id).where(condition)
+    )).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    user, profile = row
+    UserCache.put(user, profile)
+    return user, profile
+
+def get_current_user(identity: Tuple[User, Optional[Profile]] = Depends(get_identity)) -> User:
+    return identity[0]
+
+def get_current_profile(identity: Tuple[User, Optional[Profile]] = Depends(get_identity)) -> Optional[Profile]:
+    return identity[1]
 
 @router.post("/auth/login")
-def login(payload: dict, session: Session = Depends(get_session)):
+async def login(payload: dict, session: AsyncSession = Depends(get_async_session)):
     email = payload.get("email")
     password = payload.get("password")
     if not email or not password:
         raise HTTPException(status_code=400, detail="Email and password are required")
     
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = (await session.exec(select(User).where(User.email == email))).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found. Please register.")
     
     if not user.hashed_password:
         raise HTTPException(status_code=400, detail="User account has no password set (possibly social login).")
 
-    if not verify_password(password, user.hashed_password):
+    # bcrypt runs on the hashing process pool, not in the request path
+    if not await PasswordHasher.verify(password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid password")
+
+    # Work factor changed since this hash was made: upgrade it while we have the password
+    if PasswordHasher.needs_rehash(user.hashed_password):
+        user.hashed_password = await PasswordHasher.hash(password)
+        session.add(user)
+        await session.commit()
+        UserCache.invalidate(user.id)
     
-    return {"user": user}
+    return {"user": user, "token": AuthTokens.issue(user)}
 
 @router.post("/auth/register")
-def register_user(payload: dict, session: Session = Depends(get_session)):
+async def register_user(payload: dict, session: AsyncSession = Depends(get_async_session)):
     email = payload.get("email")
     password = payload.get("password")
     if not email or not password:
         raise HTTPException(status_code=400, detail="Email and password are required")
     
-    existing_user = session.exec(select(User).where(User.email == email)).first()
+    existing_user = (await session.exec(select(User).where(User.email == email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Create User
-    user = User(email=email, hashed_password=hash_password(password), subscription_tier="free")
+    user = User(email=email, hashed_password=await PasswordHasher.hash(password), subscription_tier="free")
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     
     # Create Profile
     profile_data = payload.get("profile", {})
@@ -92,13 +123,16 @@ def register_user(payload: dict, session: Session = Depends(get_session)):
         years_experience=profile_data.get("years_experience", 0)
     )
     session.add(new_profile)
-    session.commit()
+    await session.commit()
     
-    return {"user": user, "message": "User registered successfully"}
+    return {"user": user, "token": AuthTokens.issue(user), "message": "User registered successfully"}
 
 @router.post("/auth/social")
 def social_login(payload: dict, session: Session = Depends(get_session)):
-    # Placeholder for social login
+    # Placeholder for social login: nothing proves the caller owns `email`, so it
+    # stays disabled until a provider ID token is verified here
+    if not AUTH_ALLOW_SOCIAL_PLACEHOLDER:
+        raise HTTPException(status_code=501, detail="Social login is not available")
     email = payload.get("email")
     provider = payload.get("provider") # google, github, linkedin
     
@@ -116,27 +150,63 @@ def social_login(payload: dict, session: Session = Depends(get_session)):
             first_name=payload.get("first_name", "Social"),
             last_name=payload.get("last_name", "User"),
             email=email,
-            phone=""
+            phone="",
+            location=""
         )
         session.add(profile)
         session.commit()
     
+    # No session token: with the placeholder on, clients fall back to X-User-Email
+    # (which needs AUTH_ALLOW_EMAIL_HEADER as well)
     return {"user": user, "provider": provider}
 
 @router.post("/upload-resume")
-async def upload_resume(file: UploadFile = File(...), session: Session = Depends(get_session)):
-    content = await file.read()
+async def upload_resume(file: UploadFile = File(...), user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    # Spooled to disk in chunks and parsed on the process pool, so neither the
+    # whole upload nor the PDF extraction sits on the event loop
+    try:
+        path, file_hash = await ResumeService.spool_upload(file.file, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        text_content = ResumeService.parse_resume(content, file.filename)
+        # Same file uploaded again by this user: make it the latest, nothing to store
+        own_copy = (await session.exec(
+            select(Resume).where(Resume.user_id == user.id, Resume.file_hash == file_hash).limit(1)
+        )).first()
+        if own_copy:
+            own_copy.filename = file.filename
+            own_copy.upload_date = datetime.utcnow()
+            session.add(own_copy)
+            await session.commit()
+            return {"id": own_copy.id, "filename": own_copy.filename, "message": "Resume uploaded successfully"}
+
+        # Known file (another user's upload): reuse its text and the LLM's summary/skills,
+        # from the newest copy that was parsed if there is one
+        known = (await session.exec(
+            select(Resume.content, Resume.skills, Resume.summary)
+            .where(Resume.file_hash == file_hash)
+            .order_by(Resume.summary.is_(None), Resume.upload_date.desc())
+            .limit(1)
+        )).first()
+        if known:
+            resume = Resume(user_id=user.id, content=known.content, skills=known.skills or [], summary=known.summary,
+                            file_hash=file_hash, filename=file.filename)
+        else:
+            text_content = await ResumeService.parse_resume_async(path, file.filename)
+            # The raw file goes to the blob store; the row only keeps its hash
+            await asyncio.to_thread(BlobStore.put_file, path, file_hash)
+            resume = Resume(user_id=user.id, content=text_content, file_hash=file_hash, filename=file.filename)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing resume: {str(e)}")
+    finally:
+        os.unlink(path)
 
-    resume = Resume(content=text_content, file_content=content, filename=file.filename)
     session.add(resume)
-    session.commit()
-    session.refresh(resume)
+    await session.commit()
+    await session.refresh(resume)
     return {"id": resume.id, "filename": resume.filename, "message": "Resume uploaded successfully"}
 
 @router.get("/search-jobs")
@@ -144,15 +214,16 @@ def search_jobs(query: str, location: str):
     return JobSearchService.search_jobs(query, location)
 
 @router.post("/preferences")
-def create_preferences(prefs: JobPreference, session: Session = Depends(get_session)):
+def create_preferences(prefs: JobPreference, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    prefs.user_id = user.id
     session.add(prefs)
     session.commit()
     session.refresh(prefs)
     return prefs
 
 @router.get("/profile")
-def get_profile(user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    profile = session.exec(select(Profile).where(Profile.user_id == user.id)).first()
+async def get_profile(profile: Optional[Profile] = Depends(get_current_profile)):
+    # Resolved along with the user, usually without a query
     return profile
 
 @router.post("/profile")
@@ -167,84 +238,68 @@ def update_profile(profile_data: Profile, user: User = Depends(get_current_user)
         profile_data.user_id = user.id
         session.add(profile_data)
     session.commit()
+    UserCache.invalidate(user.id)
     return {"message": "Profile updated successfully"}
 
 @router.post("/agent/run")
-async def run_agent(auto_apply: bool = False, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    # Get latest resume, preferences and profile
-    resume = session.exec(select(Resume).order_by(Resume.upload_date.desc())).first()
-    prefs = session.exec(select(JobPreference).order_by(JobPreference.created_at.desc())).first()
-    profile = session.exec(select(Profile).where(Profile.user_id == user.id)).first()
+async def run_agent(auto_apply: bool = False, user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    # Get latest resume; preferences and profile are read when the run starts
+    resume_id = (await session.exec(
+        select(Resume.id).where(Resume.user_id == user.id).order_by(Resume.upload_date.desc()).limit(1)
+    )).first()
 
-    if not resume:
+    if not resume_id:
         raise HTTPException(status_code=400, detail="Please upload a resume first")
     
-    # Initialize state
-    initial_state = {
-        "resume": resume.content,
-        "resume_bytes": resume.file_content,
-        "resume_filename": resume.filename,
-        "resume_summary": None,
-        "extracted_skills": [],
-        "preferences": prefs,
-        "profile": profile,
-        "found_jobs": [],
-        "current_job": None,
-        "application_status": "searching",
-        "applications_submitted": [],
-        "logs": ["Agent workflow started"],
-        "user_id": user.id,
-        "auto_apply": auto_apply
-    }
-
-    # Run the graph
-    result = await agent_graph.ainvoke(initial_state)
-
-    # Update resume with extracted info
-    if result.get("extracted_skills") or result.get("resume_summary"):
-        resume.skills = result.get("extracted_skills", [])
-        resume.summary = result.get("resume_summary")
-        session.add(resume)
-
-    # In a real app, the agent nodes would update the DB. 
-    # For this prototype, we'll sync the 'applied' jobs here.
-    for job_url in result.get("applications_submitted", []):
-        # Find the job details from found_jobs
-        job_details = next((j for j in result["found_jobs"] if j["url"] == job_url), None)
-        if job_details:
-            app = Application(
-                user_id=user.id,
-                job_title=job_details["title"],
-                company=job_details["company"],
-                job_url=job_url,
-                fit_score=job_details.get("fit_score", 0.0),
-                explanation=job_details.get("explanation"),
-                cover_letter=job_details.get("cover_letter"),
-                status="Applied"
-            )
-            session.add(app)
-    
-    session.commit()
+    # The graph (scraping, LLM scoring, auto-apply) runs on the background workers;
+    # follow it via /agent/runs/{run_id} or /agent/runs/{run_id}/events
+    run = await AgentRunService.enqueue(session, user.id, resume_id, auto_apply)
 
     return {
-        "status": "success",
-        "logs": result.get("logs", []),
-        "applications_count": len(result.get("applications_submitted", []))
+        "status": run.status,
+        "run_id": run.id
     }
 
+def _get_user_run(run_id: str, user: User, session: Session) -> AgentRun:
+    run = session.get(AgentRun, run_id)
+    if not run or run.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@router.get("/agent/runs/{run_id}")
+def get_agent_run(run_id: str, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    return _get_user_run(run_id, user, session)
+
+@router.get("/agent/runs/{run_id}/events")
+def stream_agent_run(run_id: str, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """
+    Server-sent events: one 'log' event per log line and a 'status' event on every
+    node/status change, ending once the run completes or fails.
+    """
+    _get_user_run(run_id, user, session)
+
+    async def event_stream():
+        async for event in AgentRunService.events(run_id):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.get("/applications", response_model=List[Application])
-def get_applications(user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    return session.exec(select(Application).where(Application.user_id == user.id)).all()
+async def get_applications(user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    return (await session.exec(select(Application).where(Application.user_id == user.id))).all()
 @router.post("/agent/analyze-single")
-async def analyze_single_job(job_data: dict, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    resume = session.exec(select(Resume).order_by(Resume.upload_date.desc())).first()
-    prefs = session.exec(select(JobPreference).order_by(JobPreference.created_at.desc())).first()
+async def analyze_single_job(job_data: dict, user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    resume_content = (await session.exec(
+        select(Resume.content).where(Resume.user_id == user.id).order_by(Resume.upload_date.desc()).limit(1)
+    )).first()
+    prefs = (await session.exec(
+        select(JobPreference).where(JobPreference.user_id == user.id).order_by(JobPreference.created_at.desc()).limit(1)
+    )).first()
     
-    if not resume:
+    if resume_content is None:
         raise HTTPException(status_code=400, detail="Please upload a resume first")
 
-    # Use Gemini to analyze just this job
-    llm = get_llm(model_type="gemini")
+    # Analyze just this job (provider picked by the router)
     parser = JsonOutputParser()
     
     # We can reuse the prompt logic from nodes.py or just implement it here for simplicity
@@ -254,25 +309,95 @@ async def analyze_single_job(job_data: dict, user: User = Depends(get_current_us
     }
     
     prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a world class career assistant. Analyze the fit between the candidate's resume and the job description. Return JSON with 'score' (0-1), 'explanation', and 'cover_letter'."),
+        ("system", "You are a world class career assistant. Analyze the fit between the candidate's resume and the job description. Return JSON with 'score' (0-1) and 'explanation'."),
         ("user", "Job: {job_title} at {company}\nDescription: {description}\n\nResume Summary: {resume_summary}\n\nUser Profile/Preferences: {prefs}\n\nAnalyze fit:")
     ])
     
-    chain = prompt | llm | parser
+    build_chain = lambda llm: prompt | llm | parser
     
-    result = await chain.ainvoke({
+    # Raw content, cut down to the sections that matter for this job
+    resume_text = ResumeChunker.pack(resume_content, f"{job_data.get('title') or ''}\n{job_data.get('description') or ''}")
+    cache_key = FitScoreCache.make_key("analyze_single/v4", resume_text, job_data, criteria)
+    # The fit cache is sync, keep it off the event loop
+    cached = await asyncio.to_thread(FitScoreCache.get, cache_key)
+    if cached:
+        return cached
+    
+    result = await llm_router.invoke(FIT_SCORING, build_chain, {
         "job_title": job_data.get("title"),
         "company": job_data.get("company"),
         "description": job_data.get("description"),
-        "resume_summary": resume.content[:5000], # Use raw content if summary not yet generated
+        "resume_summary": resume_text,
         "prefs": json.dumps(criteria)
     })
     
+    if isinstance(result, dict):
+        # Same shape analyze_fit stores, so both paths read back a 0-1 score
+        result = normalize_fit_result(result)
+        await asyncio.to_thread(FitScoreCache.put, cache_key, result)
     return result
 
+@router.post("/applications/{application_id}/cover-letter")
+def stream_cover_letter(application_id: int, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """
+    Returns the application's cover letter, generating (and streaming) it on first request.
+    """
+    application = session.get(Application, application_id)
+    if not application or application.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    if application.cover_letter:
+        return StreamingResponse(iter([application.cover_letter]), media_type="text/plain")
+
+    resume = session.exec(
+        select(Resume.summary, Resume.content).where(Resume.user_id == user.id).order_by(Resume.upload_date.desc()).limit(1)
+    ).first()
+    inputs = cover_letter_input(
+        application.job_title,
+        application.company,
+        application.job_description,
+        (resume.summary or ResumeChunker.pack(resume.content, f"{application.job_title}\n{application.job_description or ''}")) if resume else "",
+        application.explanation
+    )
+
+    async def generate():
+        chunks = []
+        async for chunk in llm_router.stream(COVER_LETTER, cover_letter_chain, inputs):
+            chunks.append(chunk)
+            yield chunk
+        # The request session is closed once streaming starts, persist with our own
+        async with AsyncSession(async_engine) as write_session:
+            app_row = await write_session.get(Application, application_id)
+            app_row.cover_letter = "".join(chunks)
+            write_session.add(app_row)
+            await write_session.commit()
+
+    return StreamingResponse(generate(), media_type="text/plain")
+
+@router.get("/agent/llm-stats")
+def get_llm_stats(user: User = Depends(get_current_user)):
+    return llm_router.summary()
+
+@router.get("/agent/fit-cache/stats")
+def get_fit_cache_stats(user: User = Depends(get_current_user)):
+    return FitScoreCache.stats()
+
+@router.get("/agent/form-cache/stats")
+def get_form_cache_stats(user: User = Depends(get_current_user)):
+    return FormMappingCache.stats()
+
+@router.get("/auth/user-cache/stats")
+def get_user_cache_stats(user: User = Depends(get_current_user)):
+    return UserCache.stats()
+
 @router.get("/user/status")
 def get_user_status(user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    resume = session.exec(select(Resume).order_by(Resume.upload_date.desc())).first()
+    resume = session.exec(
+        select(Resume.filename, Resume.upload_date, Resume.skills, Resume.summary)
+        .where(Resume.user_id == user.id)
+        .order_by(Resume.upload_date.desc())
+        .limit(1)
+    ).first()
     return {
         "user": user,
         "resume": {
@@ -1,18 +1,28 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from sqlmodel import Field, SQLModel, Column, JSON
+from sqlalchemy import Index
 from datetime import datetime
+from uuid import uuid4
 
 class Resume(SQLModel, table=True):
+    # "Latest resume of a user" is an index range scan
+    __table_args__ = (Index("ix_resume_user_id_upload_date", "user_id", "upload_date"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     content: str
-    file_content: bytes = Field(default=b"")
+    file_content: bytes = Field(default=b"")  # Legacy inline upload, moved to the blob store at startup
+    file_hash: Optional[str] = Field(default=None, index=True)  # BlobStore key (sha256) of the uploaded file
     filename: str
     skills: List[str] = Field(default=[], sa_column=Column(JSON))
     summary: Optional[str] = Field(default=None)
     upload_date: datetime = Field(default_factory=datetime.utcnow)
 
 class JobPreference(SQLModel, table=True):
+    __table_args__ = (Index("ix_jobpreference_user_id_created_at", "user_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     role: List[str] = Field(default=[""], sa_column=Column(JSON))
     experience_level: List[str] = Field(default=["Intermediate"], sa_column=Column(JSON))
     location: List[str] = Field(default=[""], sa_column=Column(JSON))
@@ -23,21 +33,25 @@ class JobPreference(SQLModel, table=True):
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    email: str = Field(unique=True)
+    email: str = Field(unique=True)  # The unique constraint doubles as the lookup index
     hashed_password: Optional[str] = Field(default=None)
     subscription_tier: str = Field(default="free")  # "free" or "pro"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Application(SQLModel, table=True):
+    # One application per job and user; bulk inserts skip rows that already exist
+    __table_args__ = (Index("ux_application_user_id_job_url", "user_id", "job_url", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
     job_title: str
     company: str
     job_url: str
     status: str = Field(default="Applied") # Applied, Rejected, Interview, Submitted
     fit_score: float
     explanation: Optional[str] = Field(default=None)
-    cover_letter: Optional[str] = Field(default=None)
+    cover_letter: Optional[str] = Field(default=None)  # Generated lazily, see /applications/{id}/cover-letter
+    job_description: Optional[str] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Profile(SQLModel, table=True):
@@ -54,3 +68,57 @@ class Profile(SQLModel, table=True):
     years_experience: int = Field(default=0)
     expected_salary: Optional[str] = None
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class JobPosting(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cache_key: str = Field(index=True)  # sha256 of normalized sites/query/location/window
+    query: str
+    location: str
+    posted_within_days: int
+    data: Dict = Field(default={}, sa_column=Column(JSON))  # Job dict as returned by JobSearchService
+    fetched_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class ScoredJob(SQLModel, table=True):
+    # One row per job and user, upserted every time the job is scored
+    __table_args__ = (Index("ux_scoredjob_user_id_canonical_url", "user_id", "canonical_url", unique=True),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    canonical_url: str = Field(index=True)
+    fingerprint: str = Field(index=True)  # See JobDedupService.fingerprint
+    fit_score: float
+    context_hash: Optional[str] = Field(default=None)  # See JobDedupService.scoring_context
+    scored_at: Optional[datetime] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class FitResult(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cache_key: str = Field(unique=True, index=True)  # See FitScoreCache.make_key
+    score: float
+    explanation: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class AgentRun(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: uuid4().hex, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    resume_id: int = Field(foreign_key="resume.id")
+    auto_apply: bool = Field(default=False)
+    status: str = Field(default="queued")  # queued, running, completed, failed
+    current_node: Optional[str] = Field(default=None)
+    logs: List[str] = Field(default=[], sa_column=Column(JSON))
+    applications_count: int = Field(default=0)
+    error: Optional[str] = Field(default=None)
+    # Process executing (or holding in its queue) the run, kept while it heartbeats
+    owner: Optional[str] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class FormMapping(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    fingerprint: str = Field(unique=True, index=True)  # See FormMappingCache.fingerprint
+    mapping: Dict = Field(default={}, sa_column=Column(JSON))  # field name -> CSS selector
+    hits: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow)
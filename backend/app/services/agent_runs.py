@@ -0,0 +1,438 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import uuid4
+
+from sqlmodel import Session, select
+from sqlalchemy import or_, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
+from app.database import engine
+from app.services.blob_store import BlobStore
+from app.services.job_dedup import JobDedupService
+from app.models import AgentRun, Resume, JobPreference, Profile, Application
+from app.agent.graph import agent_graph
+
+AGENT_RUN_WORKERS = int(os.getenv("AGENT_RUN_WORKERS", "2"))
+EVENT_POLL_SECONDS = 1.0
+# A run whose owner hasn't renewed its lease for this long is taken over (queued) or failed (running)
+AGENT_RUN_LEASE_SECONDS = float(os.getenv("AGENT_RUN_LEASE_SECONDS", "60"))
+HEARTBEAT_SECONDS = AGENT_RUN_LEASE_SECONDS / 3
+INSERT_BATCH_SIZE = 1000
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Identifies this process as the owner of the runs it executes
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+def _lease_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=AGENT_RUN_LEASE_SECONDS)
+
+def _lease_expired():
+    # No lease at all: a row from before leases existed
+    return or_(AgentRun.lease_expires_at.is_(None), AgentRun.lease_expires_at < datetime.utcnow())
+
+class AgentRunService:
+    """
+    In-process run queue for the agent graph. POST /agent/run only enqueues; a pool
+    of asyncio workers executes the graph with astream and persists progress to the
+    AgentRun row after every node, so status and event endpoints work from any
+    worker process. The DB is the source of truth; runs owned by this process also
+    keep an in-memory event log that live subscribers wait on.
+    All database work goes through asyncio.to_thread, off the event loop.
+
+    Each run is leased to the process that queued it, which renews the lease every
+    HEARTBEAT_SECONDS. Only runs whose lease has expired are recovered by another
+    process, so several workers (or a rolling restart) can share the table.
+    """
+    _queue: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+    _heartbeat: Optional[asyncio.Task] = None
+    # run id -> {"events": [...], "condition": asyncio.Condition}, for runs queued here
+    _live: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    async def start(num_workers: int = AGENT_RUN_WORKERS):
+        AgentRunService._queue = asyncio.Queue()
+        await AgentRunService._adopt_expired()
+        AgentRunService._workers = [
+            asyncio.create_task(AgentRunService._worker(i)) for i in range(num_workers)
+        ]
+        AgentRunService._heartbeat = asyncio.create_task(AgentRunService._heartbeat_loop())
+
+    @staticmethod
+    async def stop():
+        tasks = AgentRunService._workers + ([AgentRunService._heartbeat] if AgentRunService._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        AgentRunService._workers = []
+        AgentRunService._heartbeat = None
+        await asyncio.to_thread(AgentRunService._release_all)
+
+    @staticmethod
+    async def _heartbeat_loop():
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(AgentRunService._renew_leases)
+                await AgentRunService._adopt_expired()
+            except Exception as e:
+                print(f"Agent run heartbeat failed: {e}")
+
+    @staticmethod
+    async def _adopt_expired():
+        for run_id, logs in await asyncio.to_thread(AgentRunService._recover):
+            AgentRunService._track(run_id, logs)
+            AgentRunService._queue.put_nowait(run_id)
+
+    @staticmethod
+    def _renew_leases():
+        with Session(engine) as session:
+            session.exec(
+                update(AgentRun)
+                .where(AgentRun.owner == WORKER_ID, AgentRun.status.in_(("queued", "running")))
+                .values(lease_expires_at=_lease_expiry())
+            )
+            session.commit()
+
+    @staticmethod
+    def _recover() -> List[tuple]:
+        """
+        Fails running runs whose owner stopped heartbeating (they can't be resumed
+        mid-graph), claims queued ones the same way and returns their (id, logs).
+        """
+        with Session(engine) as session:
+            session.exec(
+                update(AgentRun)
+                .where(AgentRun.status == "running", _lease_expired())
+                .values(status="failed", error="Interrupted: the worker running it stopped", updated_at=datetime.utcnow())
+            )
+            candidates = session.exec(
+                select(AgentRun.id).where(AgentRun.status == "queued", _lease_expired()).order_by(AgentRun.created_at)
+            ).all()
+            claimed = []
+            for run_id in candidates:
+                # Re-checked in the UPDATE, so only one process wins each run
+                result = session.exec(
+                    update(AgentRun)
+                    .where(AgentRun.id == run_id, AgentRun.status == "queued", _lease_expired())
+                    .values(owner=WORKER_ID, lease_expires_at=_lease_expiry())
+                )
+                if result.rowcount:
+                    claimed.append(run_id)
+            session.commit()
+            if not claimed:
+                return []
+            print(f"Recovered {len(claimed)} queued agent runs")
+            logs = dict(session.exec(select(AgentRun.id, AgentRun.logs).where(AgentRun.id.in_(claimed))).all())
+            return [(run_id, logs[run_id]) for run_id in claimed]
+
+    @staticmethod
+    def _release_all():
+        """
+        On shutdown: fails what was running here and frees what was still queued,
+        so another process picks it up right away instead of after the lease.
+        """
+        with Session(engine) as session:
+            session.exec(
+                update(AgentRun)
+                .where(AgentRun.owner == WORKER_ID, AgentRun.status == "running")
+                .values(status="failed", error="Interrupted by server shutdown", updated_at=datetime.utcnow())
+            )
+            session.exec(
+                update(AgentRun)
+                .where(AgentRun.owner == WORKER_ID, AgentRun.status == "queued")
+                .values(owner=None, lease_expires_at=None)
+            )
+            session.commit()
+
+    @staticmethod
+    async def enqueue(session: AsyncSession, user_id: int, resume_id: int, auto_apply: bool) -> AgentRun:
+        """
+        Must run on the event loop the workers live on: asyncio.Queue isn't
+        thread-safe, so it can't be fed from a threadpool endpoint.
+        """
+        run = AgentRun(
+            user_id=user_id, resume_id=resume_id, auto_apply=auto_apply, logs=["Agent run queued"],
+            owner=WORKER_ID, lease_expires_at=_lease_expiry()
+        )
+        session.add(run)
+        await session.commit()
+        AgentRunService._track(run.id, run.logs)
+        AgentRunService._queue.put_nowait(run.id)
+        return run
+
+    @staticmethod
+    async def _worker(index: int):
+        while True:
+            run_id = await AgentRunService._queue.get()
+            try:
+                await AgentRunService._execute(run_id)
+            except Exception as e:
+                print(f"Agent run {run_id} crashed: {e}")
+                await AgentRunService._update(run_id, status="failed", error=str(e))
+            finally:
+                AgentRunService._queue.task_done()
+
+    @staticmethod
+    def _track(run_id: str, logs: List[str]):
+        """
+        Starts the in-memory event log of a run this process will execute.
+        """
+        events = [{"type": "log", "index": i, "message": m} for i, m in enumerate(logs or [])]
+        events.append({"type": "status", "status": "queued", "current_node": None, "applications_count": 0, "error": None})
+        AgentRunService._live[run_id] = {"events": events, "condition": asyncio.Condition()}
+
+    @staticmethod
+    async def _update(run_id: str, new_logs: Optional[List[str]] = None, **fields) -> None:
+        """
+        Persists progress and publishes it to live subscribers.
+        """
+        first_index = await asyncio.to_thread(AgentRunService._persist, run_id, new_logs, fields)
+        if first_index is None:
+            return
+        events = [{"type": "log", "index": first_index + i, "message": m} for i, m in enumerate(new_logs or [])]
+        if fields:
+            events.append({"type": "status", **{k: v for k, v in fields.items()}})
+
+        live = AgentRunService._live.get(run_id)
+        if not live:
+            return
+        async with live["condition"]:
+            live["events"].extend(events)
+            live["condition"].notify_all()
+        if fields.get("status") in TERMINAL_STATUSES:
+            # Subscribers hold their own reference; new ones read the row
+            AgentRunService._live.pop(run_id, None)
+
+    @staticmethod
+    async def _release(run_id: str):
+        """
+        Stops following a run in memory; its subscribers go back to reading the row.
+        """
+        live = AgentRunService._live.pop(run_id, None)
+        if live:
+            async with live["condition"]:
+                live["events"].append({"type": "released"})
+                live["condition"].notify_all()
+
+    @staticmethod
+    def _persist(run_id: str, new_logs: Optional[List[str]], fields: Dict[str, Any]) -> Optional[int]:
+        """
+        Returns the index of the first new log line, or None if the run is gone.
+        """
+        with Session(engine) as session:
+            run = session.get(AgentRun, run_id)
+            if not run:
+                return None
+            first_index = len(run.logs)
+            if new_logs:
+                run.logs = run.logs + new_logs
+            for key, value in fields.items():
+                setattr(run, key, value)
+            run.updated_at = datetime.utcnow()
+            session.add(run)
+            session.commit()
+            return first_index
+
+    @staticmethod
+    def _initial_state(session: Session, run: AgentRun) -> Optional[Dict[str, Any]]:
+        resume = session.exec(
+            select(Resume.content, Resume.filename, Resume.file_hash, Resume.skills, Resume.summary)
+            .where(Resume.id == run.resume_id)
+        ).first()
+        if not resume:
+            return None
+        prefs = session.exec(
+            select(JobPreference).where(JobPreference.user_id == run.user_id).order_by(JobPreference.created_at.desc()).limit(1)
+        ).first()
+        profile = session.exec(select(Profile).where(Profile.user_id == run.user_id)).first()
+        return {
+            "resume": resume.content,
+            # The file itself is only needed to upload it when auto-applying
+            "resume_bytes": BlobStore.get(resume.file_hash) if run.auto_apply else None,
+            "resume_filename": resume.filename,
+            # Parsed by an earlier run (or an identical upload); parse_resume skips the LLM
+            "resume_summary": resume.summary,
+            "extracted_skills": resume.skills or [],
+            "preferences": prefs,
+            "profile": profile,
+            "found_jobs": [],
+            "scored_jobs": [],
+            "scoring_context": None,
+            "current_job": None,
+            "application_status": "searching",
+            "applications_submitted": [],
+            "logs": ["Agent workflow started"],
+            "user_id": run.user_id,
+            "auto_apply": run.auto_apply
+        }
+
+    @staticmethod
+    def _load(run_id: str) -> Optional[tuple]:
+        """
+        Moves the run from queued to running if this process still owns it.
+        """
+        with Session(engine) as session:
+            result = session.exec(
+                update(AgentRun)
+                .where(AgentRun.id == run_id, AgentRun.status == "queued", AgentRun.owner == WORKER_ID)
+                .values(status="running", lease_expires_at=_lease_expiry())
+            )
+            session.commit()
+            if not result.rowcount:
+                return None
+            run = session.get(AgentRun, run_id)
+            return run.resume_id, AgentRunService._initial_state(session, run)
+
+    @staticmethod
+    async def _execute(run_id: str):
+        loaded = await asyncio.to_thread(AgentRunService._load, run_id)
+        if loaded is None:
+            await AgentRunService._release(run_id)
+            return
+        resume_id, initial_state = loaded
+        if initial_state is None:
+            await AgentRunService._update(run_id, status="failed", error="Resume not found")
+            return
+
+        await AgentRunService._update(run_id, new_logs=initial_state["logs"], status="running")
+
+        # Each update is {node: partial state}; nodes return the full log list, so
+        # only the tail past what we've already published is new
+        result = dict(initial_state)
+        published = len(initial_state["logs"])
+        async for update in agent_graph.astream(initial_state, stream_mode="updates"):
+            for node, changes in update.items():
+                if not changes:
+                    continue
+                result.update(changes)
+                logs = result.get("logs", [])
+                await AgentRunService._update(run_id, new_logs=logs[published:], current_node=node)
+                published = len(logs)
+
+        applications_count = await asyncio.to_thread(
+            AgentRunService._save_results, initial_state["user_id"], resume_id, result
+        )
+
+        await AgentRunService._update(run_id, status="completed", current_node=None, applications_count=applications_count)
+
+    @staticmethod
+    def _save_results(user_id: int, resume_id: int, result: Dict[str, Any]) -> int:
+        with Session(engine) as session:
+            # Update resume with extracted info
+            resume = session.get(Resume, resume_id)
+            if resume and (result.get("extracted_skills") or result.get("resume_summary")):
+                resume.skills = result.get("extracted_skills", [])
+                resume.summary = result.get("resume_summary")
+                session.add(resume)
+
+            # In a real app, the agent nodes would update the DB.
+            # For this prototype, we'll sync the 'applied' jobs here.
+            jobs_by_url = {j["url"]: j for j in result.get("found_jobs", [])}
+            rows = []
+            for job_url in dict.fromkeys(result.get("applications_submitted", [])):
+                job_details = jobs_by_url.get(job_url)
+                if job_details:
+                    rows.append(Application(
+                        user_id=user_id,
+                        job_title=job_details["title"],
+                        company=job_details["company"],
+                        job_url=job_url,
+                        fit_score=job_details.get("fit_score", 0.0),
+                        explanation=job_details.get("explanation"),
+                        cover_letter=job_details.get("cover_letter"),
+                        job_description=job_details.get("description"),
+                        status="Applied"
+                    ).model_dump(exclude={"id"}))
+            inserted = AgentRunService._insert_applications(session, rows)
+            print(f"Saved {inserted} new applications ({len(rows) - inserted} already existed)")
+            # Same transaction: jobs are only hidden from later runs once the run is saved
+            JobDedupService.record_scored(session, user_id, result.get("scored_jobs", []), result.get("scoring_context"))
+
+            session.commit()
+            return len(result.get("applications_submitted", []))
+
+    @staticmethod
+    def _insert_applications(session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        One multi-row INSERT ... ON CONFLICT (user_id, job_url) DO NOTHING, so jobs
+        applied to in an earlier run aren't duplicated. Returns the rows inserted.
+        """
+        if not rows:
+            return 0
+        dialect = session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            inserted = 0
+            # Chunked to stay under the drivers' bind parameter limits
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                statement = insert(Application).values(rows[start:start + INSERT_BATCH_SIZE]).on_conflict_do_nothing(
+                    index_elements=["user_id", "job_url"]
+                )
+                inserted += session.exec(statement).rowcount
+            return inserted
+
+        # Other databases: filter out existing rows, then one bulk insert
+        existing = set(session.exec(
+            select(Application.job_url).where(
+                Application.user_id == rows[0]["user_id"],
+                Application.job_url.in_([r["job_url"] for r in rows])
+            )
+        ).all())
+        rows = [r for r in rows if r["job_url"] not in existing]
+        if rows:
+            session.exec(Application.__table__.insert(), params=rows)
+        return len(rows)
+
+    @staticmethod
+    def _get_run(run_id: str) -> Optional[AgentRun]:
+        with Session(engine) as session:
+            return session.get(AgentRun, run_id)
+
+    @staticmethod
+    async def events(run_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields log/status events for a run until it finishes. Runs queued in this
+        process are followed through their in-memory event log without touching
+        the DB; others (finished, or owned by another process) are read from the
+        row, re-read every EVENT_POLL_SECONDS while they are still going.
+        """
+        next_index = 0
+        status = None
+        live = AgentRunService._live.get(run_id)
+        position = 0
+        while live:
+            async with live["condition"]:
+                await live["condition"].wait_for(lambda: len(live["events"]) > position)
+                new_events = live["events"][position:]
+            position += len(new_events)
+            for event in new_events:
+                if event["type"] == "released":
+                    live = None
+                    break
+                if event["type"] == "log":
+                    next_index = event["index"] + 1
+                elif "status" in event:
+                    status = event["status"]
+                yield event
+                if status in TERMINAL_STATUSES:
+                    return
+
+        while True:
+            run = await asyncio.to_thread(AgentRunService._get_run, run_id)
+            if not run:
+                return
+            for i in range(next_index, len(run.logs)):
+                yield {"type": "log", "index": i, "message": run.logs[i]}
+            next_index = max(next_index, len(run.logs))
+            if run.status != status:
+                status = run.status
+                yield {"type": "status", "status": run.status, "current_node": run.current_node,
+                       "applications_count": run.applications_count, "error": run.error}
+            if status in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(EVENT_POLL_SECONDS)
@@ -0,0 +1,117 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.models import User, Profile
+
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(7 * 24 * 3600)))
+# Trusts a bare X-User-Email header, i.e. lets anyone act as any user. Opt-in only,
+# while migrating clients from before tokens existed
+AUTH_ALLOW_EMAIL_HEADER = os.getenv("AUTH_ALLOW_EMAIL_HEADER", "false").lower() == "true"
+# /auth/social is a placeholder that checks no provider token; off unless explicitly
+# enabled for local demos, and even then it never issues a session token
+AUTH_ALLOW_SOCIAL_PLACEHOLDER = os.getenv("AUTH_ALLOW_SOCIAL_PLACEHOLDER", "false").lower() == "true"
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+if not AUTH_SECRET:
+    print("Warning: AUTH_SECRET not set, using a random key (tokens won't survive a restart or work across workers)")
+    AUTH_SECRET = secrets.token_urlsafe(32)
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+class AuthTokens:
+    """
+    Stateless session tokens: base64url(JSON claims) + "." + HMAC-SHA256 signature.
+    Verifying one needs no database round trip.
+    """
+    @staticmethod
+    def _sign(payload: str) -> str:
+        return _b64encode(hmac.new(AUTH_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest())
+
+    @staticmethod
+    def issue(user: User) -> str:
+        claims = {"sub": user.id, "email": user.email, "exp": int(time.time()) + AUTH_TOKEN_TTL_SECONDS}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{AuthTokens._sign(payload)}"
+
+    @staticmethod
+    def verify(token: str) -> Optional[int]:
+        """
+        Returns the user id of a valid, unexpired token, else None.
+        """
+        try:
+            payload, signature = token.split(".", 1)
+            if not hmac.compare_digest(signature, AuthTokens._sign(payload)):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, UnicodeError):
+            return None
+        if claims.get("exp", 0) < time.time():
+            return None
+        return claims.get("sub")
+
+class UserCache:
+    """
+    Short-lived, process-local cache of (user, profile) by user id (and email for
+    the header fallback), so most requests resolve identity without a query.
+    Writers call invalidate(); other workers catch up within the TTL.
+    """
+    _entries: "OrderedDict[int, Tuple[float, User, Optional[Profile]]]" = OrderedDict()
+    _ids_by_email: Dict[str, int] = {}
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def get(user_id: Optional[int] = None, email: Optional[str] = None) -> Optional[Tuple[User, Optional[Profile]]]:
+        with UserCache._lock:
+            if user_id is None and email is not None:
+                user_id = UserCache._ids_by_email.get(email)
+            entry = UserCache._entries.get(user_id) if user_id is not None else None
+            if entry and time.monotonic() - entry[0] > USER_CACHE_TTL_SECONDS:
+                UserCache._drop(user_id)
+                entry = None
+            if not entry:
+                UserCache.misses += 1
+                return None
+            UserCache._entries.move_to_end(user_id)
+            UserCache.hits += 1
+            return entry[1], entry[2]
+
+    @staticmethod
+    def put(user: User, profile: Optional[Profile]):
+        with UserCache._lock:
+            UserCache._drop(user.id)
+            UserCache._entries[user.id] = (time.monotonic(), user, profile)
+            UserCache._ids_by_email[user.email] = user.id
+            while len(UserCache._entries) > USER_CACHE_MAX_ENTRIES:
+                UserCache._drop(next(iter(UserCache._entries)))
+
+    @staticmethod
+    def invalidate(user_id: int):
+        with UserCache._lock:
+            UserCache._drop(user_id)
+
+    @staticmethod
+    def _drop(user_id: int):
+        entry = UserCache._entries.pop(user_id, None)
+        if entry:
+            UserCache._ids_by_email.pop(entry[1].email, None)
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        with UserCache._lock:
+            return {"hits": UserCache.hits, "misses": UserCache.misses, "entries": len(UserCache._entries)}
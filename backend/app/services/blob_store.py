@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from sqlmodel import Session, select
+from app.database import engine
+from app.models import Resume
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "data/blobs")
+
+class BlobStore:
+    """
+    Content-addressed file store on the local filesystem (stand-in for S3/GCS).
+    Blobs are keyed by their sha256, so identical uploads are stored once and a
+    key never changes meaning. Keeps large binaries out of the database rows the
+    API reads on every request.
+    """
+    @staticmethod
+    def _path(digest: str) -> str:
+        return os.path.join(BLOB_STORE_DIR, digest[:2], digest)
+
+    @staticmethod
+    def put(data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        BlobStore._store(digest, lambda tmp: tmp.write(data))
+        return digest
+
+    @staticmethod
+    def put_file(source_path: str, digest: Optional[str] = None) -> str:
+        """
+        Like put, streaming from a file instead of holding it in memory. Pass the
+        digest if it is already known to skip hashing the file again.
+        """
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(source_path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+
+        def copy(tmp):
+            with open(source_path, "rb") as f:
+                shutil.copyfileobj(f, tmp)
+
+        BlobStore._store(digest, copy)
+        return digest
+
+    @staticmethod
+    def _store(digest: str, write):
+        path = BlobStore._path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as tmp:
+            write(tmp)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def get(digest: Optional[str]) -> Optional[bytes]:
+        if not digest:
+            return None
+        try:
+            with open(BlobStore._path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            print(f"BlobStore: blob {digest} not found")
+            return None
+
+    @staticmethod
+    def migrate_resume_files():
+        """
+        Moves upload bytes still stored inline in resume.file_content into the
+        store, one row at a time so only a single file is in memory.
+        """
+        with Session(engine) as session:
+            ids = session.exec(
+                select(Resume.id).where(Resume.file_hash.is_(None), Resume.file_content != b"")
+            ).all()
+            for resume_id in ids:
+                resume = session.get(Resume, resume_id)
+                resume.file_hash = BlobStore.put(resume.file_content)
+                resume.file_content = b""
+                session.add(resume)
+                session.commit()
+                session.expunge(resume)
+        if ids:
+            print(f"Moved {len(ids)} resume files to the blob store")
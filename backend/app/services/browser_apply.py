@@ -1,51 +1,137 @@
 import asyncio
 import os
-import tempfile
-from typing import Optional, Dict, Any
-from playwright.async_api import async_playwright, Page
+import mimetypes
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from urllib.parse import urlparse
+from playwright.async_api import Page, Route
 from app.models import Profile
-from app.agent.llm_factory import get_llm
+from app.services.browser_pool import BrowserPool
+from app.services.form_mapping_cache import FormMappingCache
+from app.agent.llm_router import llm_router, FORM_MAPPING
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
+APPLY_MAX_CONCURRENCY = int(os.getenv("APPLY_MAX_CONCURRENCY", "4"))
+# Most postings live on a handful of ATS hosts (Greenhouse, Lever, ...); keep the
+# load on each one low so we don't get rate limited or banned
+APPLY_MAX_PER_HOST = int(os.getenv("APPLY_MAX_PER_HOST", "2"))
+APPLY_JOB_TIMEOUT_SECONDS = float(os.getenv("APPLY_JOB_TIMEOUT", "90"))
+# How long to wait for form elements after the DOM is ready before snapshotting anyway
+APPLY_FORM_WAIT_SECONDS = float(os.getenv("APPLY_FORM_WAIT", "15"))
+APPLY_BLOCK_RESOURCES = os.getenv("APPLY_BLOCK_RESOURCES", "true").lower() == "true"
+
+FORM_SELECTOR = "form, input:not([type=hidden]), textarea, select"
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net",
+    "facebook.com/tr", "hotjar.com", "segment.io", "segment.com", "mixpanel.com",
+    "fullstory.com", "newrelic.com", "nr-data.net", "bat.bing.com", "linkedin.com/px",
+    "ads-twitter.com", "quantserve.com", "scorecardresearch.com", "clarity.ms",
+)
+
 class BrowserApplyService:
     @staticmethod
-    async def apply_to_job(job_url: str, profile: Profile, resume_bytes: bytes, resume_filename: str, cover_letter: Optional[str] = None) -> Dict[str, Any]:
+    async def apply_to_job(job_url: str, profile: Profile, resume_bytes: bytes, resume_filename: str, cover_letter: Optional[str] = None, timeout: float = APPLY_JOB_TIMEOUT_SECONDS) -> Dict[str, Any]:
         """
         Main entry point for autonomous job application.
         """
         if not profile:
             return {"status": "failed", "message": "User profile is required for auto-apply."}
 
-        async with async_playwright() as p:
-            # Launch browser
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-            )
+        # Isolated context from the shared browser instead of a new Chromium per job
+        async with BrowserPool.context() as context:
+            if APPLY_BLOCK_RESOURCES:
+                await context.route("**/*", BrowserApplyService._block_heavy_requests)
             page = await context.new_page()
+            timings: Dict[str, float] = {}
             
             try:
                 print(f"Navigating to {job_url}...")
-                await page.goto(job_url, wait_until="networkidle", timeout=60000)
+                started = time.perf_counter()
+                # Don't wait for networkidle: analytics beacons can keep it from ever settling.
+                # Proceed as soon as the form is there.
+                await page.goto(job_url, wait_until="domcontentloaded", timeout=timeout * 1000)
+                timings["navigation"] = time.perf_counter() - started
+
+                started = time.perf_counter()
+                try:
+                    await page.wait_for_selector(FORM_SELECTOR, state="attached", timeout=APPLY_FORM_WAIT_SECONDS * 1000)
+                except Exception:
+                    print(f"No form elements after {APPLY_FORM_WAIT_SECONDS:.0f}s on {job_url}, snapshotting anyway")
+                timings["form_wait"] = time.perf_counter() - started
                 
                 # Check for "Apply" button or form
                 # For prototype, we'll try a generic form filler
-                result = await BrowserApplyService._fill_form_with_ai(page, profile, resume_bytes, resume_filename, cover_letter)
+                result = await BrowserApplyService._fill_form_with_ai(page, profile, resume_bytes, resume_filename, cover_letter, timings)
                 
                 return result
             except Exception as e:
                 print(f"Apply Error for {job_url}: {e}")
-                return {"status": "failed", "message": str(e)}
+                return {"status": "failed", "message": str(e), "timings": timings}
             finally:
-                await browser.close()
+                print(f"Apply timings for {job_url}: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
+
+    @staticmethod
+    async def _block_heavy_requests(route: Route):
+        """
+        Aborts images, media, fonts and known trackers; a form filler needs none of them.
+        """
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @staticmethod
+    async def apply_many(jobs: List[Dict[str, Any]], profile: Profile, resume_bytes: bytes, resume_filename: str,
+                         max_concurrency: int = APPLY_MAX_CONCURRENCY, max_per_host: int = APPLY_MAX_PER_HOST,
+                         timeout: float = APPLY_JOB_TIMEOUT_SECONDS) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Applies to jobs concurrently, yielding (job, result) as each one finishes.
+        Each job gets `timeout` seconds once it has a slot; time spent waiting for
+        the global or per-host limit doesn't count against it.
+        """
+        global_limit = asyncio.Semaphore(max_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        async def apply(job: Dict[str, Any]):
+            host = urlparse(job["url"]).hostname or ""
+            host_limit = host_limits.setdefault(host, asyncio.Semaphore(max_per_host))
+            # Host first, so a job queued behind its host doesn't hold a global slot
+            async with host_limit, global_limit:
+                print(f"Auto-Applying to {job['title']}...")
+                try:
+                    result = await asyncio.wait_for(
+                        BrowserApplyService.apply_to_job(
+                            job_url=job["url"],
+                            profile=profile,
+                            resume_bytes=resume_bytes,
+                            resume_filename=resume_filename,
+                            cover_letter=job.get("cover_letter"),
+                            timeout=timeout
+                        ),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    result = {"status": "failed", "message": f"Timed out after {timeout:.0f}s"}
+                except Exception as e:
+                    result = {"status": "failed", "message": str(e)}
+            return job, result
+
+        for finished in asyncio.as_completed([apply(job) for job in jobs]):
+            yield await finished
 
     @staticmethod
-    async def _fill_form_with_ai(page: Page, profile: Profile, resume_bytes: bytes, resume_filename: str, cover_letter: Optional[str] = None) -> Dict[str, Any]:
+    async def _fill_form_with_ai(page: Page, profile: Profile, resume_bytes: bytes, resume_filename: str, cover_letter: Optional[str] = None, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
-        Uses LLM to identify fields and fill the form.
+        Uses LLM to identify fields and fill the form. Phase durations are recorded
+        in `timings` when given.
         """
+        timings = timings if timings is not None else {}
+
         # 1. Capture Page State (Simplified DOM)
+        started = time.perf_counter()
         dom_snapshot = await page.evaluate("""() => {
             const inputs = Array.from(document.querySelectorAll('input, select, textarea, button'));
             return inputs.map(i => ({
@@ -58,9 +144,9 @@ class BrowserApplyService:
                 label: document.querySelector(`label[for="${i.id}"]`)?.innerText || ''
             })).filter(i => i.type !== 'hidden').slice(0, 50); // Limit to top 50 elements
         }""")
+        timings["snapshot"] = time.perf_counter() - started
 
         # 2. Ask LLM for Mapping
-        llm = get_llm(model_type="gemini")
         parser = JsonOutputParser()
         
         prompt = ChatPromptTemplate.from_messages([
@@ -68,27 +154,39 @@ class BrowserApplyService:
             ("user", "Elements: {elements}\n\nProfile: {profile}\n\nIdentify selectors in JSON format:")
         ])
         
-        chain = prompt | llm | parser
+        build_chain = lambda llm: prompt | llm | parser
         
         try:
-            mapping = await chain.ainvoke({
-                "elements": dom_snapshot,
-                "profile": profile.model_dump()
-            })
+            started = time.perf_counter()
+            # Known form template whose selectors still resolve: skip the LLM
+            fingerprint = FormMappingCache.fingerprint(dom_snapshot)
+            # The mapping cache is sync, keep it off the loop the browser pool shares
+            mapping = await asyncio.to_thread(FormMappingCache.get, fingerprint)
+            if mapping and not await BrowserApplyService._selectors_present(page, mapping):
+                print("Cached form mapping is stale, asking the LLM again")
+                await asyncio.to_thread(FormMappingCache.invalidate, fingerprint)
+                mapping = None
+
+            if not mapping:
+                mapping = await llm_router.invoke(FORM_MAPPING, build_chain, {
+                    "elements": dom_snapshot,
+                    "profile": profile.model_dump()
+                })
+                if isinstance(mapping, dict) and mapping:
+                    await asyncio.to_thread(FormMappingCache.put, fingerprint, mapping)
+            timings["mapping"] = time.perf_counter() - started
             
             # 3. Perform Actions
+            started = time.perf_counter()
             # Upload Resume first if found
             if "resume_upload" in mapping:
-                with tempfile.NamedTemporaryFile(suffix=os.path.splitext(resume_filename)[1], delete=False) as tmp:
-                    tmp.write(resume_bytes)
-                    tmp_path = tmp.name
-                
-                try:
-                    await page.set_input_files(mapping["resume_upload"], tmp_path)
-                    print(f"Uploaded resume: {resume_filename}")
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
+                # Straight from memory, no temp file per application
+                await page.set_input_files(mapping["resume_upload"], {
+                    "name": resume_filename,
+                    "mimeType": mimetypes.guess_type(resume_filename)[0] or "application/octet-stream",
+                    "buffer": resume_bytes
+                })
+                print(f"Uploaded resume: {resume_filename}")
 
             # Fill Text Fields
             fields_to_fill = {
@@ -108,8 +206,25 @@ class BrowserApplyService:
 
             # Submit (disabled in prototype for safety unless specifically requested)
             # await page.click(mapping["submit_button"])
+            timings["fill"] = time.perf_counter() - started
             
-            return {"status": "success", "message": "Form filled successfully (Submit pending confirmation)"}
+            return {"status": "success", "message": "Form filled successfully (Submit pending confirmation)", "timings": timings}
             
         except Exception as e:
-            return {"status": "failed", "message": f"AI Mapping failed: {str(e)}"}
+            return {"status": "failed", "message": f"AI Mapping failed: {str(e)}", "timings": timings}
+
+    @staticmethod
+    async def _selectors_present(page: Page, mapping: Dict[str, Any]) -> bool:
+        """
+        True if every selector in the mapping matches an element on the page.
+        """
+        for selector in mapping.values():
+            if not isinstance(selector, str) or not selector:
+                continue
+            try:
+                if await page.query_selector(selector) is None:
+                    return False
+            except Exception:
+                # Not a valid selector for this page
+                return False
+        return True
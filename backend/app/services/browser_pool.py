@@ -0,0 +1,119 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "50"))
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+
+class BrowserPool:
+    """
+    One long-lived Chromium shared by all auto-applies. Each application gets its
+    own BrowserContext (isolated cookies/storage), at most BROWSER_MAX_CONTEXTS at
+    a time. The browser is relaunched if it dies and recycled after
+    BROWSER_RECYCLE_AFTER contexts to keep its memory in check; a recycled browser
+    is closed once its last open context is done.
+    """
+    _playwright: Optional[Playwright] = None
+    _browser: Optional[Browser] = None
+    _served = 0
+    _open_contexts: Dict[Browser, int] = {}
+    _lock: Optional[asyncio.Lock] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _primitives():
+        if BrowserPool._lock is None:
+            BrowserPool._lock = asyncio.Lock()
+            BrowserPool._semaphore = asyncio.Semaphore(BROWSER_MAX_CONTEXTS)
+        return BrowserPool._lock, BrowserPool._semaphore
+
+    @staticmethod
+    async def start():
+        """
+        Launches the browser up front. Failure isn't fatal: the app still runs and
+        the next auto-apply retries the launch.
+        """
+        lock, _ = BrowserPool._primitives()
+        try:
+            async with lock:
+                await BrowserPool._ensure_browser()
+            print("Browser pool ready")
+        except Exception as e:
+            print(f"Browser pool failed to start: {e}")
+
+    @staticmethod
+    async def stop():
+        for browser in list(BrowserPool._open_contexts):
+            await BrowserPool._close_browser(browser)
+        BrowserPool._browser = None
+        if BrowserPool._playwright:
+            await BrowserPool._playwright.stop()
+            BrowserPool._playwright = None
+
+    @staticmethod
+    async def _launch() -> Browser:
+        if BrowserPool._playwright is None:
+            BrowserPool._playwright = await async_playwright().start()
+        browser = await BrowserPool._playwright.chromium.launch(headless=True)
+        BrowserPool._open_contexts[browser] = 0
+        BrowserPool._served = 0
+        return browser
+
+    @staticmethod
+    async def _close_browser(browser: Browser):
+        BrowserPool._open_contexts.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception as e:
+            print(f"Error closing browser: {e}")
+
+    @staticmethod
+    async def _ensure_browser() -> Browser:
+        """
+        Health check and recycling; callers hold the pool lock.
+        """
+        browser = BrowserPool._browser
+        if browser is not None and not browser.is_connected():
+            print("Browser pool: browser disconnected, relaunching")
+            BrowserPool._open_contexts.pop(browser, None)
+            browser = None
+        elif browser is not None and BrowserPool._served >= BROWSER_RECYCLE_AFTER:
+            print(f"Browser pool: recycling browser after {BrowserPool._served} contexts")
+            if BrowserPool._open_contexts.get(browser, 0) == 0:
+                await BrowserPool._close_browser(browser)
+            browser = None
+        if browser is None:
+            browser = await BrowserPool._launch()
+            BrowserPool._browser = browser
+        return browser
+
+    @staticmethod
+    @asynccontextmanager
+    async def context() -> AsyncIterator[BrowserContext]:
+        """
+        Borrows a fresh, isolated BrowserContext, waiting for a free slot if the
+        pool is at capacity.
+        """
+        lock, semaphore = BrowserPool._primitives()
+        async with semaphore:
+            async with lock:
+                browser = await BrowserPool._ensure_browser()
+                BrowserPool._served += 1
+                BrowserPool._open_contexts[browser] = BrowserPool._open_contexts.get(browser, 0) + 1
+            try:
+                context = await browser.new_context(user_agent=USER_AGENT)
+                try:
+                    yield context
+                finally:
+                    await context.close()
+            finally:
+                async with lock:
+                    if browser in BrowserPool._open_contexts:
+                        BrowserPool._open_contexts[browser] -= 1
+                        # Last context of a browser that has since been replaced
+                        if BrowserPool._open_contexts[browser] == 0 and browser is not BrowserPool._browser:
+                            await BrowserPool._close_browser(browser)
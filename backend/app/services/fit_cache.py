@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+from sqlmodel import Session, select, delete, func
+from app.database import engine
+from app.models import FitResult
+
+FIT_CACHE_MAX_ENTRIES = int(os.getenv("FIT_CACHE_MAX_ENTRIES", "20000"))
+
+class FitScoreCache:
+    """
+    Persistent memoization of LLM fit results. Keys are content hashes of the
+    resume text, the job and the criteria JSON, so any change to one of them is
+    a miss. Least recently used rows are evicted past FIT_CACHE_MAX_ENTRIES.
+    """
+    hits = 0
+    misses = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _digest(value: str) -> str:
+        return hashlib.sha256((value or "").encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_key(prompt_id: str, resume_text: str, job: Dict, criteria: Any) -> str:
+        """
+        prompt_id namespaces results per prompt, bump it when a prompt changes.
+        """
+        job_hash = FitScoreCache._digest("|".join([
+            job.get("title") or "",
+            job.get("company") or "",
+            job.get("description") or "",
+        ]))
+        criteria_json = criteria if isinstance(criteria, str) else json.dumps(criteria, sort_keys=True)
+        return FitScoreCache._digest("|".join([
+            prompt_id,
+            FitScoreCache._digest(resume_text),
+            job_hash,
+            FitScoreCache._digest(criteria_json),
+        ]))
+
+    @staticmethod
+    def get_many(keys: List[str]) -> Dict[str, Dict]:
+        """
+        Returns {key: {"score", "explanation"}} for the keys that hit.
+        """
+        if not keys:
+            return {}
+        found = {}
+        try:
+            with Session(engine) as session:
+                rows = session.exec(select(FitResult).where(FitResult.cache_key.in_(keys))).all()
+                now = datetime.utcnow()
+                for row in rows:
+                    found[row.cache_key] = {
+                        "score": row.score,
+                        "explanation": row.explanation,
+                    }
+                    row.last_used_at = now
+                    session.add(row)
+                session.commit()
+        except Exception as e:
+            print(f"FitScoreCache: lookup failed: {e}")
+
+        with FitScoreCache._lock:
+            FitScoreCache.hits += len(found)
+            FitScoreCache.misses += len(set(keys)) - len(found)
+        return found
+
+    @staticmethod
+    def get(key: str) -> Optional[Dict]:
+        return FitScoreCache.get_many([key]).get(key)
+
+    @staticmethod
+    def put_many(results: Dict[str, Dict]):
+        if not results:
+            return
+        try:
+            with Session(engine) as session:
+                existing = set(session.exec(
+                    select(FitResult.cache_key).where(FitResult.cache_key.in_(list(results)))
+                ).all())
+                for key, result in results.items():
+                    if key in existing:
+                        continue
+                    try:
+                        score = float(result["score"])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    session.add(FitResult(
+                        cache_key=key,
+                        score=score,
+                        explanation=result.get("explanation"),
+                    ))
+                session.commit()
+                FitScoreCache._evict(session)
+        except Exception as e:
+            print(f"FitScoreCache: store failed: {e}")
+
+    @staticmethod
+    def put(key: str, result: Dict):
+        FitScoreCache.put_many({key: result})
+
+    @staticmethod
+    def _evict(session: Session):
+        count = session.exec(select(func.count()).select_from(FitResult)).one()
+        overflow = count - FIT_CACHE_MAX_ENTRIES
+        if overflow <= 0:
+            return
+        oldest = select(FitResult.id).order_by(FitResult.last_used_at).limit(overflow)
+        session.exec(delete(FitResult).where(FitResult.id.in_(oldest)))
+        session.commit()
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        with FitScoreCache._lock:
+            return {"hits": FitScoreCache.hits, "misses": FitScoreCache.misses}
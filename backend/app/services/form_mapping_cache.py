@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+from sqlmodel import Session, select, delete
+from app.database import engine
+from app.models import FormMapping
+
+class FormMappingCache:
+    """
+    Remembers the LLM's field -> selector mapping per form template. Most
+    applications go through a handful of ATS forms, so the key is a fingerprint
+    of the form's structure only (tags, types, names, ids, labels); placeholders
+    and current values are left out since they vary between postings.
+    """
+    hits = 0
+    misses = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(dom_snapshot: List[Dict[str, Any]]) -> str:
+        structure = sorted(
+            "|".join(str(element.get(k) or "") for k in ("tag", "type", "name", "id", "label"))
+            for element in dom_snapshot
+        )
+        return hashlib.sha256(json.dumps(structure).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get(fingerprint: str) -> Optional[Dict[str, str]]:
+        mapping = None
+        try:
+            with Session(engine) as session:
+                row = session.exec(select(FormMapping).where(FormMapping.fingerprint == fingerprint)).first()
+                if row:
+                    mapping = dict(row.mapping)
+                    row.hits += 1
+                    row.last_used_at = datetime.utcnow()
+                    session.add(row)
+                    session.commit()
+        except Exception as e:
+            print(f"FormMappingCache: lookup failed: {e}")
+
+        with FormMappingCache._lock:
+            if mapping:
+                FormMappingCache.hits += 1
+            else:
+                FormMappingCache.misses += 1
+        return mapping
+
+    @staticmethod
+    def put(fingerprint: str, mapping: Dict[str, str]):
+        try:
+            with Session(engine) as session:
+                row = session.exec(select(FormMapping).where(FormMapping.fingerprint == fingerprint)).first()
+                if row:
+                    row.mapping = mapping
+                    row.last_used_at = datetime.utcnow()
+                else:
+                    row = FormMapping(fingerprint=fingerprint, mapping=mapping)
+                session.add(row)
+                session.commit()
+        except Exception as e:
+            print(f"FormMappingCache: store failed: {e}")
+
+    @staticmethod
+    def invalidate(fingerprint: str):
+        try:
+            with Session(engine) as session:
+                session.exec(delete(FormMapping).where(FormMapping.fingerprint == fingerprint))
+                session.commit()
+        except Exception as e:
+            print(f"FormMappingCache: invalidate failed: {e}")
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        with FormMappingCache._lock:
+            return {"hits": FormMappingCache.hits, "misses": FormMappingCache.misses}
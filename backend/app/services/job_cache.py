@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+
+from sqlmodel import Session, select, delete
+from app.database import engine
+from app.models import JobPosting
+
+# Fresh for TTL seconds, then served stale (and refreshed in the background)
+# for another STALE seconds before it is treated as a miss.
+CACHE_TTL_SECONDS = int(os.getenv("JOB_CACHE_TTL_SECONDS", "3600"))
+CACHE_STALE_SECONDS = int(os.getenv("JOB_CACHE_STALE_SECONDS", "21600"))
+CACHE_MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", "256"))
+
+FRESH = "fresh"
+STALE = "stale"
+
+class JobPostingCache:
+    """
+    Two-level cache for scraped postings: a process-local LRU in front of the
+    shared JobPosting table, so results are reused across workers and users.
+    """
+    _memory: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, location: str, posted_within_days: int, sites: List[str], results_wanted: int) -> str:
+        normalized = "|".join([
+            ",".join(sorted(s.strip().lower() for s in sites)),
+            " ".join(query.lower().split()),
+            " ".join(location.lower().split()),
+            str(posted_within_days),
+            str(results_wanted),
+        ])
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _state(fetched_at: float) -> Optional[str]:
+        age = time.time() - fetched_at
+        if age <= CACHE_TTL_SECONDS:
+            return FRESH
+        if age <= CACHE_TTL_SECONDS + CACHE_STALE_SECONDS:
+            return STALE
+        return None
+
+    @staticmethod
+    def get(key: str) -> Optional[Tuple[List[Dict], str]]:
+        """
+        Returns (jobs, FRESH|STALE) or None on a miss. Jobs are copies, since the
+        agent annotates them in place with scores and cover letters.
+        """
+        with JobPostingCache._lock:
+            entry = JobPostingCache._memory.get(key)
+            if entry:
+                JobPostingCache._memory.move_to_end(key)
+
+        if not entry:
+            entry = JobPostingCache._load(key)
+            if entry:
+                JobPostingCache._remember(key, *entry)
+
+        if not entry:
+            return None
+        fetched_at, jobs = entry
+        state = JobPostingCache._state(fetched_at)
+        if state is None:
+            return None
+        return [dict(j) for j in jobs], state
+
+    @staticmethod
+    def put(key: str, query: str, location: str, posted_within_days: int, jobs: List[Dict]):
+        now = datetime.utcnow()
+        JobPostingCache._remember(key, time.time(), [dict(j) for j in jobs])
+        try:
+            with Session(engine) as session:
+                session.exec(delete(JobPosting).where(JobPosting.cache_key == key))
+                # Opportunistically evict anything past its stale window
+                expired = now - timedelta(seconds=CACHE_TTL_SECONDS + CACHE_STALE_SECONDS)
+                session.exec(delete(JobPosting).where(JobPosting.fetched_at < expired))
+                session.add_all([
+                    JobPosting(
+                        cache_key=key,
+                        query=query,
+                        location=location,
+                        posted_within_days=posted_within_days,
+                        data=job,
+                        fetched_at=now,
+                    )
+                    for job in jobs
+                ])
+                session.commit()
+        except Exception as e:
+            print(f"JobPostingCache: failed to persist {key[:12]}: {e}")
+
+    @staticmethod
+    def _remember(key: str, fetched_at: float, jobs: List[Dict]):
+        with JobPostingCache._lock:
+            JobPostingCache._memory[key] = (fetched_at, jobs)
+            JobPostingCache._memory.move_to_end(key)
+            while len(JobPostingCache._memory) > CACHE_MAX_ENTRIES:
+                JobPostingCache._memory.popitem(last=False)
+
+    @staticmethod
+    def _load(key: str) -> Optional[Tuple[float, List[Dict]]]:
+        try:
+            with Session(engine) as session:
+                rows = session.exec(select(JobPosting).where(JobPosting.cache_key == key)).all()
+        except Exception as e:
+            print(f"JobPostingCache: failed to load {key[:12]}: {e}")
+            return None
+        if not rows:
+            return None
+        # fetched_at is naive UTC (datetime.utcnow), convert to an epoch timestamp
+        fetched_at = rows[0].fetched_at.replace(tzinfo=None) - datetime(1970, 1, 1)
+        return fetched_at.total_seconds(), [row.data for row in rows]
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, List, Dict, Optional, Set
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import numpy as np
+from sqlmodel import Session, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.database import engine
+from app.models import ScoredJob
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: candidate pairs from ~0.5 estimated similarity
+NEAR_DUP_THRESHOLD = float(os.getenv("JOB_DEDUP_THRESHOLD", "0.8"))
+# Scored jobs are hidden from later runs for this long (same resume and criteria only)
+SCORED_JOB_TTL_HOURS = float(os.getenv("SCORED_JOB_TTL_HOURS", "72"))
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240501)  # Fixed seed so signatures are stable across processes
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+_TRACKING_PARAMS = {"ref", "refid", "trk", "trackingid", "src", "source", "from", "position", "pagenum", "fbclid", "gclid"}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_COMPANY_SUFFIX_RE = re.compile(r"\b(inc|llc|ltd|corp|corporation|co|company|gmbh|plc)\b")
+
+class JobDedupService:
+    @staticmethod
+    def canonicalize_url(url: str) -> str:
+        """
+        Reduces a job URL to the part that identifies the posting, dropping tracking
+        params, fragments and board-specific slugs.
+        """
+        if not url:
+            return ""
+        parts = urlsplit(url.strip())
+        host = parts.netloc.lower()
+        for prefix in ("www.", "m."):
+            if host.startswith(prefix):
+                host = host[len(prefix):]
+        path = parts.path.rstrip("/")
+        params = dict(parse_qsl(parts.query))
+
+        if "linkedin.com" in host:
+            job_id = params.get("currentJobId") or re.search(r"(\d+)$", path)
+            if job_id is not None:
+                job_id = job_id if isinstance(job_id, str) else job_id.group(1)
+                return f"https://linkedin.com/jobs/view/{job_id}"
+        if "indeed." in host and params.get("jk"):
+            return f"https://{host}/viewjob?jk={params['jk']}"
+        if "glassdoor." in host and params.get("jobListingId"):
+            return f"https://{host}/job-listing?jl={params['jobListingId']}"
+
+        query = urlencode(sorted(
+            (k, v) for k, v in params.items()
+            if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+        ))
+        return urlunsplit(("https", host, path, query, ""))
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(_WORD_RE.findall((text or "").lower()))
+
+    @staticmethod
+    def _normalize_company(company: str) -> str:
+        return " ".join(_COMPANY_SUFFIX_RE.sub(" ", JobDedupService._normalize(company)).split())
+
+    @staticmethod
+    def fingerprint(job: Dict) -> str:
+        """
+        Stable identity for a posting across boards: normalized title, company and
+        the city part of the location.
+        """
+        city = (job.get("location") or "").split(",")[0]
+        key = "|".join([
+            JobDedupService._normalize(job.get("title", "")),
+            JobDedupService._normalize_company(job.get("company", "")),
+            JobDedupService._normalize(city),
+        ])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def minhash(text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature over word shingles. Returns None when the text is too short
+        to say anything (e.g. the "No description available." placeholder).
+        """
+        words = _WORD_RE.findall((text or "").lower())
+        if len(words) < SHINGLE_SIZE * 2:
+            return None
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # (a*x + b) mod p for every permutation/shingle pair, then min per permutation
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def dedupe(jobs: List[Dict]) -> List[Dict]:
+        """
+        Collapses postings that share a canonical URL, or that are from the same
+        company with near-identical descriptions. The copy with the longest
+        description is kept, in order of first appearance. Each surviving job gets
+        'canonical_url' and 'fingerprint' keys.
+        """
+        n = len(jobs)
+        parent = list(range(n))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+        by_url: Dict[str, int] = {}
+        buckets: Dict[tuple, List[int]] = {}
+        signatures = []
+        companies = []
+        rows = NUM_PERMUTATIONS // LSH_BANDS
+
+        for i, job in enumerate(jobs):
+            job["canonical_url"] = JobDedupService.canonicalize_url(job.get("url", ""))
+            job["fingerprint"] = JobDedupService.fingerprint(job)
+            if job["canonical_url"]:
+                if job["canonical_url"] in by_url:
+                    union(i, by_url[job["canonical_url"]])
+                else:
+                    by_url[job["canonical_url"]] = i
+
+            sig = JobDedupService.minhash(job.get("description", ""))
+            signatures.append(sig)
+            companies.append(JobDedupService._normalize_company(job.get("company", "")))
+            if sig is None:
+                continue
+            for band in range(LSH_BANDS):
+                band_key = (band, companies[i], sig[band * rows:(band + 1) * rows].tobytes())
+                for j in buckets.setdefault(band_key, []):
+                    if find(i) != find(j) and float(np.mean(sig == signatures[j])) >= NEAR_DUP_THRESHOLD:
+                        union(i, j)
+                buckets[band_key].append(i)
+
+        best: Dict[int, int] = {}
+        for i, job in enumerate(jobs):
+            root = find(i)
+            if root not in best or len(job.get("description", "")) > len(jobs[best[root]].get("description", "")):
+                best[root] = i
+
+        return [jobs[best[root]] for root in sorted(best)]
+
+    @staticmethod
+    def scoring_context(resume_text: str, criteria: Any, min_score: Any) -> str:
+        """
+        Hash of everything a score (and what's done with it) depends on besides the
+        job itself: a new resume, other preferences or another threshold make
+        previously scored jobs eligible again.
+        """
+        criteria_json = criteria if isinstance(criteria, str) else json.dumps(criteria, sort_keys=True)
+        return hashlib.sha256("|".join([resume_text or "", criteria_json, str(min_score)]).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def filter_unscored(user_id: int, jobs: List[Dict], context_hash: str) -> List[Dict]:
+        """
+        Drops jobs this user had scored in the last SCORED_JOB_TTL_HOURS under the
+        same scoring context, matched by canonical URL: the fingerprint (title,
+        company, city) is shared by distinct postings like "Software Engineer" at a
+        big company. Expects jobs that went through dedupe().
+        """
+        if not user_id or not jobs:
+            return jobs
+        urls = [j["canonical_url"] for j in jobs if j.get("canonical_url")]
+        if not urls:
+            return jobs
+        cutoff = datetime.utcnow() - timedelta(hours=SCORED_JOB_TTL_HOURS)
+        with Session(engine) as session:
+            seen_urls: Set[str] = set(session.exec(
+                select(ScoredJob.canonical_url).where(
+                    ScoredJob.user_id == user_id,
+                    ScoredJob.context_hash == context_hash,
+                    ScoredJob.scored_at >= cutoff,
+                    ScoredJob.canonical_url.in_(urls),
+                )
+            ).all())
+        return [j for j in jobs if j.get("canonical_url") not in seen_urls]
+
+    @staticmethod
+    def record_scored(session: Session, user_id: int, jobs: List[Dict], context_hash: str):
+        """
+        Upserts on (user_id, canonical_url): a job scored again, under a new context
+        or after the TTL, refreshes its row instead of adding one. Jobs without a
+        URL can't be recognized later and aren't recorded. The caller commits, so
+        this lands together with the run's applications.
+        """
+        if not user_id or not jobs:
+            return
+        now = datetime.utcnow()
+        rows = {}
+        for j in jobs:
+            canonical_url = j.get("canonical_url") or JobDedupService.canonicalize_url(j.get("url", ""))
+            if not canonical_url:
+                continue
+            rows[canonical_url] = {
+                "user_id": user_id,
+                "canonical_url": canonical_url,
+                "fingerprint": j.get("fingerprint") or JobDedupService.fingerprint(j),
+                "fit_score": j.get("fit_score", 0.0),
+                "context_hash": context_hash,
+                "scored_at": now,
+                "created_at": now,
+            }
+        rows = list(rows.values())
+        if not rows:
+            return
+        refreshed = ("fingerprint", "fit_score", "context_hash", "scored_at")
+
+        dialect = session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = insert(ScoredJob).values(rows)
+            session.exec(statement.on_conflict_do_update(
+                index_elements=["user_id", "canonical_url"],
+                set_={column: statement.excluded[column] for column in refreshed},
+            ))
+        else:
+            existing = {
+                row.canonical_url: row for row in session.exec(
+                    select(ScoredJob).where(
+                        ScoredJob.user_id == user_id,
+                        ScoredJob.canonical_url.in_([r["canonical_url"] for r in rows]),
+                    )
+                ).all()
+            }
+            for r in rows:
+                row = existing.get(r["canonical_url"])
+                if row:
+                    for column in refreshed:
+                        setattr(row, column, r[column])
+                else:
+                    row = ScoredJob(**r)
+                session.add(row)
@@ -0,0 +1,124 @@
+import os
+import re
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+PREFILTER_TOP_K = int(os.getenv("FIT_PREFILTER_TOP_K", "15"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+SKILL_WEIGHT = 0.6
+BM25_WEIGHT = 0.4
+MISMATCH_PENALTY = 0.3
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = {"and", "or", "the", "a", "an", "of", "in", "for", "to", "with", "on", "at", "engineer", "developer"}
+
+# Title keywords -> seniority bucket, and which JobPreference.experience_level values accept it
+_SENIORITY_PATTERNS = {
+    "junior": re.compile(r"\b(intern|internship|junior|jr|entry|graduate|new grad)\b"),
+    "senior": re.compile(r"\b(senior|sr|lead|staff|principal|architect)\b"),
+    "management": re.compile(r"\b(manager|director|head of|vp|vice president|chief)\b"),
+}
+_LEVEL_BUCKETS = {
+    "intern": "junior", "entry-level": "junior",
+    "senior": "senior", "staff": "senior", "principal": "senior",
+    "manager": "management", "director": "management", "executive": "management",
+}
+_JOB_TYPE_PATTERNS = {
+    "contract": re.compile(r"\b(contract|contractor|contract-to-hire|c2c|1099)\b"),
+    "part-time": re.compile(r"\bpart[- ]time\b"),
+}
+
+class JobRanker:
+    """
+    Cheap local scoring used to shortlist jobs before the LLM sees them.
+    """
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        return _TOKEN_RE.findall((text or "").lower())
+
+    @staticmethod
+    def _hard_mismatch(title: str, description: str, experience_levels: List[str], job_types: List[str]) -> bool:
+        title = (title or "").lower()
+        if experience_levels:
+            wanted_buckets = {_LEVEL_BUCKETS.get(level.lower()) for level in experience_levels}
+            for bucket, pattern in _SENIORITY_PATTERNS.items():
+                if pattern.search(title) and bucket not in wanted_buckets:
+                    return True
+
+        wanted_types = {t.lower() for t in job_types}
+        if wanted_types:
+            head = f"{title} {(description or '')[:500].lower()}"
+            for job_type, pattern in _JOB_TYPE_PATTERNS.items():
+                if pattern.search(head) and job_type not in wanted_types:
+                    return True
+        return False
+
+    @staticmethod
+    def score(jobs: List[Dict], skills: List[str], roles: List[str], experience_levels: List[str], job_types: List[str]) -> np.ndarray:
+        """
+        Returns a relevance score in [0, 1] per job: skill coverage blended with
+        BM25 over the skill/role terms, scaled down on seniority or job type mismatch.
+        """
+        skill_tokens = [[t for t in JobRanker._tokenize(skill) if t not in _STOPWORDS] for skill in skills]
+        skill_tokens = [tokens for tokens in skill_tokens if tokens]
+        query_terms = sorted({t for tokens in skill_tokens for t in tokens} |
+                             {t for role in roles for t in JobRanker._tokenize(role) if t not in _STOPWORDS})
+        if not query_terms:
+            return np.ones(len(jobs))
+        term_index = {term: i for i, term in enumerate(query_terms)}
+
+        # Term frequency matrix over the query vocabulary only (docs x terms)
+        tf = np.zeros((len(jobs), len(query_terms)), dtype=np.float32)
+        doc_len = np.zeros(len(jobs), dtype=np.float32)
+        for row, job in enumerate(jobs):
+            tokens = JobRanker._tokenize(f"{job.get('title', '')} {job.get('description', '')}")
+            doc_len[row] = len(tokens)
+            for token in tokens:
+                col = term_index.get(token)
+                if col is not None:
+                    tf[row, col] += 1
+
+        # Skill coverage: a skill counts when all of its tokens appear in the doc
+        present = (tf > 0).astype(np.float32)
+        if skill_tokens:
+            skill_matrix = np.zeros((len(skill_tokens), len(query_terms)), dtype=np.float32)
+            for i, tokens in enumerate(skill_tokens):
+                skill_matrix[i, [term_index[t] for t in tokens]] = 1
+            matched = (present @ skill_matrix.T) >= skill_matrix.sum(axis=1)
+            coverage = matched.mean(axis=1)
+        else:
+            coverage = np.zeros(len(jobs))
+
+        # BM25
+        n_docs = len(jobs)
+        df = present.sum(axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avg_len = max(float(doc_len.mean()), 1.0)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+        bm25 = (idf * tf * (BM25_K1 + 1) / (tf + norm[:, None])).sum(axis=1)
+        bm25 = bm25 / bm25.max() if bm25.max() > 0 else bm25
+
+        scores = SKILL_WEIGHT * coverage + BM25_WEIGHT * bm25
+        penalty = np.array([
+            MISMATCH_PENALTY if JobRanker._hard_mismatch(j.get("title", ""), j.get("description", ""), experience_levels, job_types) else 1.0
+            for j in jobs
+        ])
+        return scores * penalty
+
+    @staticmethod
+    def shortlist(jobs: List[Dict], skills: List[str], roles: List[str], experience_levels: List[str], job_types: List[str], top_k: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Splits jobs into (top_k best by local score, the rest). Each job gets a
+        'local_score'. Order within the shortlist follows the local score.
+        """
+        top_k = PREFILTER_TOP_K if top_k is None else top_k
+        if not jobs:
+            return [], []
+        scores = JobRanker.score(jobs, skills, roles, experience_levels, job_types)
+        for job, s in zip(jobs, scores):
+            job["local_score"] = round(float(s), 4)
+        order = np.argsort(-scores, kind="stable")
+        return [jobs[i] for i in order[:top_k]], [jobs[i] for i in order[top_k:]]
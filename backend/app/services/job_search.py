@@ -1,27 +1,103 @@
 from jobspy import scrape_jobs
 import pandas as pd
-from typing import List, Dict
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from app.services.job_cache import JobPostingCache, STALE
+
+DEFAULT_SITES = ["indeed", "linkedin", "glassdoor"]
+
+# jobspy is fully blocking (requests + HTML parsing), so every scrape runs on a
+# bounded pool instead of the event loop. Single-site scrapes get a pool per site:
+# abandoned scrapes keep their thread, and a hung board must only starve itself.
+SEARCH_MAX_WORKERS = int(os.getenv("JOB_SEARCH_MAX_WORKERS", "6"))
+SITE_MAX_WORKERS = int(os.getenv("JOB_SEARCH_SITE_MAX_WORKERS", "2"))
+SITE_TIMEOUT_SECONDS = float(os.getenv("JOB_SEARCH_SITE_TIMEOUT", "45"))
+# Upper bound for a whole fan-out, including searches queued behind a hung board
+SEARCH_DEADLINE_SECONDS = float(os.getenv("JOB_SEARCH_DEADLINE", "120"))
+RESULTS_WANTED = int(os.getenv("JOB_SEARCH_RESULTS_WANTED", "20"))
+
+_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="jobspy")
+_site_executors: Dict[str, ThreadPoolExecutor] = {}
+_site_executors_lock = threading.Lock()
+
+def _pool(site_names: List[str]) -> ThreadPoolExecutor:
+    if len(site_names) != 1:
+        return _executor
+    site = site_names[0]
+    with _site_executors_lock:
+        if site not in _site_executors:
+            _site_executors[site] = ThreadPoolExecutor(max_workers=SITE_MAX_WORKERS, thread_name_prefix=f"jobspy-{site}")
+        return _site_executors[site]
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
 class JobSearchService:
     @staticmethod
-    def search_jobs(query: str, location: str, posted_within_days: int = 7) -> List[Dict]:
+    def search_jobs(query: str, location: str, posted_within_days: int = 7, sites: Optional[List[str]] = None, results_wanted: int = RESULTS_WANTED) -> List[Dict]:
+        """
+        Cached entry point for job searches. Fresh hits are returned directly, stale
+        hits are returned immediately while a background scrape refreshes them, and
+        misses scrape synchronously.
+        """
+        site_names = sites or DEFAULT_SITES
+        key = JobPostingCache.make_key(query, location, posted_within_days, site_names, results_wanted)
+
+        cached = JobPostingCache.get(key)
+        if cached:
+            jobs, state = cached
+            print(f"JobSpy: Cache {state} hit for {site_names} '{query}' in '{location}' ({len(jobs)} jobs)")
+            if state == STALE:
+                JobSearchService._schedule_refresh(key, query, location, posted_within_days, site_names, results_wanted)
+            return jobs
+
+        return JobSearchService._scrape_and_cache(key, query, location, posted_within_days, site_names, results_wanted)
+
+    @staticmethod
+    def _scrape_and_cache(key: str, query: str, location: str, posted_within_days: int, site_names: List[str], results_wanted: int) -> List[Dict]:
+        jobs = JobSearchService._scrape(query, location, posted_within_days, site_names, results_wanted)
+        # Empty results are usually errors or rate limits, don't pin them in the cache
+        if jobs:
+            JobPostingCache.put(key, query, location, posted_within_days, jobs)
+        return jobs
+
+    @staticmethod
+    def _schedule_refresh(key: str, query: str, location: str, posted_within_days: int, site_names: List[str], results_wanted: int):
+        with _refreshing_lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+
+        def refresh():
+            try:
+                JobSearchService._scrape_and_cache(key, query, location, posted_within_days, site_names, results_wanted)
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+
+        _pool(site_names).submit(refresh)
+
+    @staticmethod
+    def _scrape(query: str, location: str, posted_within_days: int, site_names: List[str], results_wanted: int = RESULTS_WANTED) -> List[Dict]:
         """
         Searches for jobs using python-jobspy across multiple sites (Indeed, LinkedIn, Glassdoor).
         """
-        print(f"JobSpy: Scraping jobs for '{query}' in '{location}' (Last {posted_within_days} days)...")
-        results = []
+        print(f"JobSpy: Scraping {site_names} for '{query}' in '{location}' (Last {posted_within_days} days)...")
         
         try:
             # JobSpy uses 'hours_old'
             hours = posted_within_days * 24
             
             # Scrape Indeed & LinkedIn & Glassdoor "indeed", "linkedin", "glassdoor"
-            # Note: We limit results_wanted to 20 for better coverage
+            # Note: results_wanted is per site (JOB_SEARCH_RESULTS_WANTED, default 20)
             jobs: pd.DataFrame = scrape_jobs(
-                site_name=["indeed", "linkedin", "glassdoor"], 
+                site_name=site_names,
                 search_term=query,
                 location=location,
-                results_wanted=20, 
+                results_wanted=results_wanted, 
                 hours_old=hours, 
                 country_indeed='USA',
                 linkedin_fetch_description=True # Need description for analysis
@@ -31,41 +107,102 @@ class JobSearchService:
                 print("JobSpy: No jobs found.")
                 return []
             
-            print(f"JobSpy: Found {len(jobs)} jobs. \n Details: {jobs}")
+            by_site = jobs["site"].value_counts().to_dict() if "site" in jobs.columns else {}
+            print(f"JobSpy: Found {len(jobs)} jobs {by_site}.")
             
-            # Convert to our format
-            for _, row in jobs.iterrows():
-                # Handle missing description or NaN
-                description = row.get("description")
-                if pd.isna(description) or not description:
-                    description = "No description available."
-                
-                title = row.get("title")
-                if pd.isna(title): title = "Unknown Title"
-                
-                company = row.get("company")
-                if pd.isna(company): company = "Unknown Company"
-                
-                loc = row.get("location")
-                if pd.isna(loc): loc = location
-                
-                url = row.get("job_url")
-                if pd.isna(url): url = ""
-
-                # Create job dict
-                job_data = {
-                    "id": str(row.get("id")) if not pd.isna(row.get("id")) else "",
-                    "title": str(title),
-                    "company": str(company),
-                    "location": str(loc),
-                    "description": str(description),
-                    "url": str(url),
-                    "fit_score": 0.0 # Will be populated by Agent
-                }
-                results.append(job_data)
-                
-            return results
+            return JobSearchService.to_job_records(jobs, location)
 
         except Exception as e:
             print(f"JobSpy Error: {e}")
             return []
+
+    @staticmethod
+    def to_job_records(jobs: pd.DataFrame, default_location: str) -> List[Dict]:
+        """
+        Converts a jobspy DataFrame to our job dicts column-wise instead of row by row.
+        """
+        def column(name: str, default: str) -> pd.Series:
+            if name not in jobs.columns:
+                return pd.Series(default, index=jobs.index, dtype=object)
+            return jobs[name].fillna(default).astype(str)
+
+        records = pd.DataFrame({
+            "id": column("id", ""),
+            "title": column("title", "Unknown Title"),
+            "company": column("company", "Unknown Company"),
+            "location": column("location", default_location),
+            "description": column("description", "").replace("", "No description available."),
+            "url": column("job_url", ""),
+        })
+        records["fit_score"] = 0.0 # Will be populated by Agent
+        return records.to_dict("records")
+
+    @staticmethod
+    async def search_jobs_async(
+        queries: List[str],
+        locations: List[str],
+        posted_within_days: int = 7,
+        sites: Optional[List[str]] = None,
+        site_timeout: float = SITE_TIMEOUT_SECONDS,
+        results_wanted: int = RESULTS_WANTED,
+        deadline: float = SEARCH_DEADLINE_SECONDS,
+    ) -> List[Dict]:
+        """
+        Fans out one scrape per (site, query, location) onto its site's worker pool and
+        merges results as they complete. A task that exceeds `site_timeout` is abandoned
+        so a slow board can't stall the run. Its worker thread can't be interrupted and
+        finishes in the background (jobspy bounds each HTTP request, not the scrape).
+        After `deadline`, searches still running or queued are dropped and the jobs
+        merged so far are returned.
+        """
+        site_names = sites or DEFAULT_SITES
+        loop = asyncio.get_running_loop()
+
+        async def run_one(site: str, query: str, location: str) -> List[Dict]:
+            started = asyncio.Event()
+
+            def search() -> List[Dict]:
+                loop.call_soon_threadsafe(started.set)
+                return JobSearchService.search_jobs(query, location, posted_within_days, [site], results_wanted)
+
+            future = loop.run_in_executor(_pool([site]), search)
+            # Only start the clock once a worker thread picks the search up. Waiting
+            # behind other searches, or behind abandoned scrapes still holding a
+            # worker, doesn't count against this site.
+            try:
+                await started.wait()
+            except asyncio.CancelledError:
+                # Past the deadline while still queued: don't let it take a worker later
+                future.cancel()
+                raise
+            try:
+                return await asyncio.wait_for(future, timeout=site_timeout)
+            except asyncio.TimeoutError:
+                print(f"JobSpy: {site} timed out after {site_timeout}s for '{query}' in '{location}'")
+                return []
+
+        tasks = [
+            asyncio.create_task(run_one(site, query, location))
+            for query in queries
+            for location in locations
+            for site in site_names
+        ]
+
+        merged: List[Dict] = []
+        seen_urls = set()
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=deadline):
+                for job in await next_done:
+                    # The same posting comes back for overlapping role/location combos
+                    if job["url"] and job["url"] in seen_urls:
+                        continue
+                    seen_urls.add(job["url"])
+                    merged.append(job)
+        except asyncio.TimeoutError:
+            pending = [t for t in tasks if not t.done()]
+            print(f"JobSpy: Search deadline of {deadline}s reached, dropping {len(pending)} unfinished searches.")
+            for task in pending:
+                task.cancel()
+
+        print(f"JobSpy: Merged {len(merged)} jobs from {len(tasks)} searches.")
+        return merged
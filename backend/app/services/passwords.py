@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes queued beyond this wait in the event loop instead of piling up in the pool
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+def _digest(password: str) -> bytes:
+    # Bcrypt has a 72-byte limit.
+    # Standard practice: hash the password with SHA256 first to allow unlimited length.
+    return hashlib.sha256(password.encode('utf-8')).hexdigest().encode('utf-8')
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(_digest(password), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(_digest(plain_password), hashed_password.encode('utf-8'))
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    # $2b$<rounds>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small process pool so a burst of logins doesn't tie up the
+    event loop or the request thread pool. Changing BCRYPT_ROUNDS takes effect
+    for new hashes, and existing ones are upgraded on the user's next login.
+    """
+    _pool: Optional[ProcessPoolExecutor] = None
+    _pending: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _executor() -> ProcessPoolExecutor:
+        if PasswordHasher._pool is None:
+            # spawn: forking a process that already runs threads (uvicorn, httpx) can deadlock
+            PasswordHasher._pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            PasswordHasher._pending = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+        return PasswordHasher._pool
+
+    @staticmethod
+    async def _run(fn, *args):
+        pool = PasswordHasher._executor()
+        async with PasswordHasher._pending:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    @staticmethod
+    async def hash(password: str) -> str:
+        return await PasswordHasher._run(hash_password, password, BCRYPT_ROUNDS)
+
+    @staticmethod
+    async def verify(plain_password: str, hashed_password: str) -> bool:
+        return await PasswordHasher._run(verify_password, plain_password, hashed_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        return hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+    @staticmethod
+    def start():
+        """
+        Spins the workers up front so the first logins don't pay process startup.
+        """
+        pool = PasswordHasher._executor()
+        for _ in range(PASSWORD_HASH_WORKERS):
+            pool.submit(hash_rounds, "")
+
+    @staticmethod
+    def stop():
+        if PasswordHasher._pool is not None:
+            PasswordHasher._pool.shutdown(wait=False, cancel_futures=True)
+            PasswordHasher._pool = None
+            PasswordHasher._pending = None
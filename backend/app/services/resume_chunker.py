@@ -0,0 +1,165 @@
+import math
+import os
+import re
+from typing import List, Dict, Tuple
+
+from app.services.job_ranker import JobRanker
+
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "1200"))
+# Summary/skills extraction sees more of the resume, it runs once per upload
+RESUME_PARSE_TOKEN_BUDGET = int(os.getenv("RESUME_PARSE_TOKEN_BUDGET", "2000"))
+CHARS_PER_TOKEN = 4  # Rough, but close enough for English prose across providers
+CHUNK_MAX_CHARS = 600
+
+SECTION_HEADINGS = {
+    "summary": ("summary", "profile", "professional summary", "career summary", "objective", "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "relevant experience", "employment",
+                   "employment history", "work history", "career history"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "technologies", "tools and technologies", "tech stack"),
+    "education": ("education", "academic background", "education and training", "qualifications"),
+    "projects": ("projects", "personal projects", "key projects", "selected projects"),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "courses", "training"),
+    "other": ("awards", "honors", "publications", "volunteering", "volunteer experience", "interests", "hobbies",
+              "languages", "references", "activities"),
+}
+_HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# How much a section is worth before looking at the job; "header" is the name/contact block
+SECTION_WEIGHTS = {
+    "header": 0.5, "summary": 1.0, "skills": 1.2, "experience": 1.1, "projects": 0.9,
+    "education": 0.7, "certifications": 0.6, "other": 0.3,
+}
+# Below this weight, a chunk sharing no terms with the job is dropped even if it would fit
+BOILERPLATE_WEIGHT = 0.6
+
+_BULLET_RE = re.compile(r"^[\s\-\*•·●▪◦>]+")
+_STOPWORDS = {"and", "or", "the", "a", "an", "of", "in", "for", "to", "with", "on", "at", "as", "is", "are", "be",
+              "we", "you", "our", "your", "will", "this", "that", "by", "from", "job", "role", "team", "work"}
+
+class ResumeChunker:
+    """
+    Section-aware resume preprocessing: split the extracted text into sections
+    (experience, skills, education, ...), cut those into chunks, rank the chunks
+    against the target job and pack the best ones into a token budget, in their
+    original order. Replaces slicing the first N characters, which dropped the
+    later sections of long resumes.
+    """
+    @staticmethod
+    def _heading(line: str) -> str:
+        normalized = " ".join(_BULLET_RE.sub("", line).strip().rstrip(":").lower().replace("&", "and").split())
+        return _HEADING_LOOKUP.get(normalized) if len(normalized) <= 40 else None
+
+    @staticmethod
+    def split_sections(text: str) -> List[Tuple[str, str, str]]:
+        """
+        Returns (section, heading line, body) in document order. Text before the
+        first recognized heading is the "header" section.
+        """
+        sections = []
+        section, heading, lines = "header", "", []
+        for line in (text or "").splitlines():
+            found = ResumeChunker._heading(line)
+            if found:
+                if any(l.strip() for l in lines):
+                    sections.append((section, heading, "\n".join(lines).strip()))
+                section, heading, lines = found, line.strip(), []
+            else:
+                lines.append(line)
+        if any(l.strip() for l in lines):
+            sections.append((section, heading, "\n".join(lines).strip()))
+        return sections
+
+    @staticmethod
+    def chunk(text: str) -> List[Dict]:
+        """
+        Chunks of at most CHUNK_MAX_CHARS, never spanning two sections.
+        """
+        chunks = []
+        for section_index, (section, heading, body) in enumerate(ResumeChunker.split_sections(text)):
+            current: List[str] = []
+            size = 0
+            for line in body.splitlines():
+                line = line.rstrip()
+                if not line.strip():
+                    continue
+                # Overlong lines (PDF extraction sometimes loses line breaks) are split hard
+                pieces = [line[i:i + CHUNK_MAX_CHARS] for i in range(0, len(line), CHUNK_MAX_CHARS)]
+                for piece in pieces:
+                    if current and size + len(piece) + 1 > CHUNK_MAX_CHARS:
+                        chunks.append({"section": section, "heading": heading, "section_index": section_index, "text": "\n".join(current)})
+                        current, size = [], 0
+                    current.append(piece)
+                    size += len(piece) + 1
+            if current:
+                chunks.append({"section": section, "heading": heading, "section_index": section_index, "text": "\n".join(current)})
+        return chunks
+
+    @staticmethod
+    def _terms(text: str) -> set:
+        return {t for t in JobRanker._tokenize(text) if t not in _STOPWORDS and len(t) > 1}
+
+    @staticmethod
+    def rank(chunks: List[Dict], query: str) -> List[float]:
+        """
+        Section weight times (a floor plus the idf-weighted share of the query's
+        terms the chunk contains). Without a query, section weight alone.
+        """
+        query_terms = ResumeChunker._terms(query)
+        if not query_terms:
+            return [SECTION_WEIGHTS[c["section"]] for c in chunks]
+        chunk_terms = [ResumeChunker._terms(c["text"]) for c in chunks]
+        idf = {term: math.log(1 + len(chunks) / (1 + sum(term in terms for terms in chunk_terms))) for term in query_terms}
+        total = sum(idf.values())
+        scores = []
+        for c, terms in zip(chunks, chunk_terms):
+            coverage = sum(idf[t] for t in query_terms & terms) / total
+            c["coverage"] = coverage
+            scores.append(SECTION_WEIGHTS[c["section"]] * (0.2 + coverage))
+        return scores
+
+    @staticmethod
+    def pack(text: str, query: str = "", token_budget: int = RESUME_TOKEN_BUDGET) -> str:
+        """
+        The most relevant chunks for `query` (job title/description, or a target
+        role) that fit in `token_budget`, in document order under their headings.
+        Every section gets its best chunk before any section gets a second one.
+        """
+        text = (text or "").strip()
+        char_budget = token_budget * CHARS_PER_TOKEN
+        chunks = ResumeChunker.chunk(text)
+        if not chunks:
+            return text[:char_budget]
+        scores = ResumeChunker.rank(chunks, query)
+
+        candidates = [
+            i for i in range(len(chunks))
+            if not (query and chunks[i].get("coverage") == 0 and SECTION_WEIGHTS[chunks[i]["section"]] < BOILERPLATE_WEIGHT)
+        ]
+        by_score = sorted(candidates, key=lambda i: (-scores[i], i))
+        best_per_section = {}
+        for i in by_score:
+            best_per_section.setdefault(chunks[i]["section_index"], i)
+        order = sorted(best_per_section.values(), key=lambda i: (-scores[i], i))
+        order += [i for i in by_score if i not in set(order)]
+
+        selected, used, headed = set(), 0, set()
+        for i in order:
+            cost = len(chunks[i]["text"]) + 1
+            # The heading is printed once per section
+            if chunks[i]["heading"] and chunks[i]["section_index"] not in headed:
+                cost += len(chunks[i]["heading"]) + 2
+            if used + cost > char_budget:
+                continue
+            selected.add(i)
+            headed.add(chunks[i]["section_index"])
+            used += cost
+
+        parts, last_section = [], None
+        for i in sorted(selected):
+            c = chunks[i]
+            if c["section_index"] != last_section and c["heading"]:
+                parts.append(f"\n{c['heading']}")
+            parts.append(c["text"])
+            last_section = c["section_index"]
+        return "\n".join(parts).strip()
@@ -1,37 +1,122 @@
+import asyncio
+import hashlib
 import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union, BinaryIO, Tuple
 from pypdf import PdfReader
 from docx import Document
 
+RESUME_MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "20"))
+RESUME_MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", "100000"))
+RESUME_MAX_UPLOAD_BYTES = int(os.getenv("RESUME_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+RESUME_PARSE_WORKERS = int(os.getenv("RESUME_PARSE_WORKERS", "2"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Raw bytes, or the path of a spooled upload
+FileSource = Union[bytes, str]
+
 class ResumeService:
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def _open(file_content: FileSource):
+        return io.BytesIO(file_content) if isinstance(file_content, bytes) else file_content
+
     @staticmethod
-    def extract_text_from_pdf(file_content: bytes) -> str:
+    def extract_text_from_pdf(file_content: FileSource) -> str:
         try:
-            reader = PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            reader = PdfReader(ResumeService._open(file_content))
+            # Page by page, stopping at the page/size caps instead of extracting everything
+            parts = []
+            size = 0
+            for number, page in enumerate(reader.pages):
+                if number >= RESUME_MAX_PAGES or size >= RESUME_MAX_CHARS:
+                    print(f"PDF truncated at page {number} of {len(reader.pages)}")
+                    break
+                text = page.extract_text() or ""
+                parts.append(text)
+                size += len(text) + 1
+            return "\n".join(parts).strip()[:RESUME_MAX_CHARS]
         except Exception as e:
             print(f"Error reading PDF: {e}")
             return ""
 
     @staticmethod
-    def extract_text_from_docx(file_content: bytes) -> str:
+    def extract_text_from_docx(file_content: FileSource) -> str:
         try:
-            doc = Document(io.BytesIO(file_content))
+            doc = Document(ResumeService._open(file_content))
             text = "\n".join([para.text for para in doc.paragraphs])
-            return text.strip()
+            return text.strip()[:RESUME_MAX_CHARS]
         except Exception as e:
             print(f"Error reading DOCX: {e}")
             return ""
 
     @staticmethod
-    def parse_resume(file_content: bytes, filename: str) -> str:
+    def parse_resume(file_content: FileSource, filename: str) -> str:
         if filename.lower().endswith(".pdf"):
             return ResumeService.extract_text_from_pdf(file_content)
         elif filename.lower().endswith(".docx"):
             return ResumeService.extract_text_from_docx(file_content)
         elif filename.lower().endswith(".txt"):
-            return file_content.decode("utf-8", errors="ignore")
+            if not isinstance(file_content, bytes):
+                with open(file_content, "rb") as f:
+                    file_content = f.read(RESUME_MAX_CHARS * 4)
+            return file_content.decode("utf-8", errors="ignore")[:RESUME_MAX_CHARS]
         else:
             raise ValueError("Unsupported file format. Please upload a PDF, DOCX, or TXT file.")
+
+    @staticmethod
+    def _executor() -> ProcessPoolExecutor:
+        if ResumeService._pool is None:
+            ResumeService._pool = ProcessPoolExecutor(
+                max_workers=RESUME_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ResumeService._pool
+
+    @staticmethod
+    async def parse_resume_async(file_content: FileSource, filename: str) -> str:
+        """
+        parse_resume on the parsing process pool, off the event loop. Pass a path
+        rather than bytes for large files so the upload isn't copied to the worker.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            ResumeService._executor(), ResumeService.parse_resume, file_content, filename
+        )
+
+    @staticmethod
+    def _copy_capped(source: BinaryIO, destination: BinaryIO) -> str:
+        copied = 0
+        sha = hashlib.sha256()
+        while chunk := source.read(UPLOAD_CHUNK_BYTES):
+            copied += len(chunk)
+            if copied > RESUME_MAX_UPLOAD_BYTES:
+                raise ValueError(f"File too large (max {RESUME_MAX_UPLOAD_BYTES // (1024 * 1024)} MB).")
+            sha.update(chunk)
+            destination.write(chunk)
+        return sha.hexdigest()
+
+    @staticmethod
+    async def spool_upload(source: BinaryIO, filename: str) -> Tuple[str, str]:
+        """
+        Copies an upload to a temp file in chunks and returns (path, sha256 of the
+        content); the caller deletes the file. Nothing holds the whole file in memory.
+        """
+        suffix = os.path.splitext(filename or "")[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            try:
+                digest = await asyncio.to_thread(ResumeService._copy_capped, source, tmp)
+            except Exception:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        return tmp.name, digest
+
+    @staticmethod
+    def stop():
+        if ResumeService._pool is not None:
+            ResumeService._pool.shutdown(wait=False, cancel_futures=True)
+            ResumeService._pool = None
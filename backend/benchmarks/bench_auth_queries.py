@@ -0,0 +1,53 @@
+"""
+Queries per request for authenticated endpoints.
+
+Compares the previous identity resolution (user looked up by X-User-Email on
+every request, then a second query for the profile) with the signed bearer
+token + UserCache path, counting SQL statements sent to the database.
+Point DATABASE_URL at a scratch database.
+Run from backend/:  python -m benchmarks.bench_auth_queries
+"""
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event
+
+from app.database import engine, async_engine
+from benchmarks.common import bench_client, build_app, legacy_headers, seed_user, token_headers
+
+REQUESTS = 200
+
+statements = 0
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def measure(client: httpx.AsyncClient, path: str, headers: dict):
+    global statements
+    statements = 0
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        (await client.get(path, headers=headers)).raise_for_status()
+    elapsed = time.perf_counter() - start
+    return statements / REQUESTS, REQUESTS / elapsed
+
+
+async def main():
+    user = seed_user()
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", count_statement)
+
+    async with bench_client(build_app()) as client:
+        print(f"{'endpoint':>14} {'before q/req':>13} {'after q/req':>12} {'before req/s':>13} {'after req/s':>12}")
+        for endpoint in ["/profile", "/applications"]:
+            before_q, before_rps = await measure(client, f"/legacy{endpoint}", legacy_headers(user))
+            after_q, after_rps = await measure(client, endpoint, token_headers(user))
+            print(f"{endpoint:>14} {before_q:>13.2f} {after_q:>12.2f} {before_rps:>13,.0f} {after_rps:>12,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
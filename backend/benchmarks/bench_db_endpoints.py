@@ -0,0 +1,66 @@
+"""
+Load benchmark for GET /applications and GET /profile.
+
+Compares the previous handlers (sync Session, user lookup on the same session)
+with the current async-session endpoints, in process over ASGI, at a few
+concurrency levels. Seeds one user with a profile and APPLICATIONS rows.
+Point DATABASE_URL at the Postgres you want to measure (a scratch database:
+tables are created and the seeded rows are left behind).
+Run from backend/:  python -m benchmarks.bench_db_endpoints
+"""
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import Application
+from benchmarks.common import bench_client, build_app, legacy_headers, seed_user, token_headers
+
+APPLICATIONS = 200
+REQUESTS = 500
+CONCURRENCY = [1, 10, 50]
+
+
+def seed() -> dict:
+    user = seed_user()
+    with Session(engine) as session:
+        session.add_all([
+            Application(user_id=user.id, job_title=f"Engineer {i}", company=f"Company {i % 20}",
+                        job_url=f"https://example.com/jobs/{uuid4().hex}", fit_score=0.8,
+                        explanation="Strong overlap on backend skills.")
+            for i in range(APPLICATIONS)
+        ])
+        session.commit()
+    # The legacy handlers read the email header, the current ones the token
+    return {**legacy_headers(user), **token_headers(user)}
+
+
+async def requests_per_second(client: httpx.AsyncClient, path: str, headers: dict, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    headers = seed()
+    async with bench_client(build_app()) as client:
+        print(f"{'endpoint':>14} {'concurrency':>12} {'sync req/s':>12} {'async req/s':>12} {'speedup':>8}")
+        for endpoint in ["/applications", "/profile"]:
+            for concurrency in CONCURRENCY:
+                before = await requests_per_second(client, f"/legacy{endpoint}", headers, concurrency)
+                after = await requests_per_second(client, endpoint, headers, concurrency)
+                print(f"{endpoint:>14} {concurrency:>12} {before:>12,.0f} {after:>12,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Microbenchmark for converting a jobspy DataFrame into job dicts.
+
+Compares the previous iterrows() loop with JobSearchService.to_job_records.
+Run from backend/:  python -m benchmarks.bench_job_records
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.job_search import JobSearchService
+
+SIZES = [100, 1_000, 10_000]
+REPEATS = 3
+
+
+def make_frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    description = "Build and operate backend services in Python. " * 40
+    frame = pd.DataFrame({
+        "id": [f"in-{i}" for i in range(n)],
+        "site": rng.choice(["indeed", "linkedin", "glassdoor"], size=n),
+        "title": [f"Software Engineer {i}" for i in range(n)],
+        "company": [f"Company {i % 50}" for i in range(n)],
+        "location": ["Remote"] * n,
+        "description": [description] * n,
+        "job_url": [f"https://example.com/jobs/{i}" for i in range(n)],
+    })
+    # jobspy leaves gaps as None/NaN, sprinkle some in
+    for column in ["title", "company", "location", "description", "job_url"]:
+        frame.loc[rng.random(n) < 0.1, column] = None
+    return frame
+
+
+def iterrows_records(jobs: pd.DataFrame, location: str):
+    results = []
+    for _, row in jobs.iterrows():
+        description = row.get("description")
+        if pd.isna(description) or not description:
+            description = "No description available."
+        title = row.get("title")
+        if pd.isna(title): title = "Unknown Title"
+        company = row.get("company")
+        if pd.isna(company): company = "Unknown Company"
+        loc = row.get("location")
+        if pd.isna(loc): loc = location
+        url = row.get("job_url")
+        if pd.isna(url): url = ""
+        results.append({
+            "id": str(row.get("id")) if not pd.isna(row.get("id")) else "",
+            "title": str(title),
+            "company": str(company),
+            "location": str(loc),
+            "description": str(description),
+            "url": str(url),
+            "fit_score": 0.0
+        })
+    return results
+
+
+def rows_per_second(fn, frame: pd.DataFrame) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(frame, "Remote")
+        best = min(best, time.perf_counter() - start)
+    return len(frame) / best
+
+
+if __name__ == "__main__":
+    print(f"{'rows':>8} {'iterrows rows/s':>18} {'vectorized rows/s':>20} {'speedup':>8}")
+    for n in SIZES:
+        frame = make_frame(n)
+        assert iterrows_records(frame, "Remote") == JobSearchService.to_job_records(frame, "Remote")
+        before = rows_per_second(iterrows_records, frame)
+        after = rows_per_second(JobSearchService.to_job_records, frame)
+        print(f"{n:>8} {before:>18,.0f} {after:>20,.0f} {after / before:>7.1f}x")
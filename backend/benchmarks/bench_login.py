@@ -0,0 +1,88 @@
+"""
+Load benchmark for POST /auth/login.
+
+Compares the previous handler (bcrypt inline on the request thread pool) with
+the current one (bcrypt on PasswordHasher's process pool). While the login
+burst runs, a cheap endpoint is polled to show how much the rest of the API
+is slowed down. Point DATABASE_URL at a scratch database.
+Run from backend/:  python -m benchmarks.bench_login
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlmodel import Session, select
+
+from app.database import get_session
+from app.models import User
+from app.services.passwords import PasswordHasher, hash_password, verify_password
+from benchmarks.common import bench_client, build_app as build_common_app, seed_user
+
+LOGINS = 64
+CONCURRENCY = [4, 16, 64]
+PASSWORD = "correct horse battery staple"
+
+
+def build_app() -> FastAPI:
+    app = build_common_app()
+
+    @app.post("/legacy/auth/login")
+    def legacy_login(payload: dict, session: Session = Depends(get_session)):
+        user = session.exec(select(User).where(User.email == payload["email"])).first()
+        if not user or not verify_password(payload["password"], user.hashed_password):
+            raise HTTPException(status_code=401, detail="Invalid password")
+        return {"user": user}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run(client: httpx.AsyncClient, path: str, email: str, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    ping_latencies = []
+
+    async def login():
+        async with semaphore:
+            response = await client.post(path, json={"email": email, "password": PASSWORD})
+            response.raise_for_status()
+
+    async def poll():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/ping")
+            ping_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    poller = asyncio.create_task(poll())
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await poller
+    return LOGINS / elapsed, statistics.quantiles(ping_latencies, n=20)[-1] * 1000
+
+
+async def main():
+    email = seed_user(hash_password(PASSWORD), profile=False).email
+    PasswordHasher.start()
+    async with bench_client(build_app(), timeout=None) as client:
+        # Warm both paths (pool workers, DB connections)
+        await run(client, "/auth/login", email, 4)
+        await run(client, "/legacy/auth/login", email, 4)
+
+        print(f"{'concurrency':>12} {'inline logins/s':>16} {'pool logins/s':>14} {'inline ping p95':>16} {'pool ping p95':>14}")
+        for concurrency in CONCURRENCY:
+            before, before_ping = await run(client, "/legacy/auth/login", email, concurrency)
+            after, after_ping = await run(client, "/auth/login", email, concurrency)
+            print(f"{concurrency:>12} {before:>16,.1f} {after:>14,.1f} {before_ping:>14,.1f}ms {after_ping:>12,.1f}ms")
+    PasswordHasher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Scaffolding shared by the endpoint benchmarks: the previous email-header
+identity dependency and its /legacy routes, a seeded bench user, and an
+in-process ASGI client.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+import httpx
+from fastapi import Depends, FastAPI, Header, HTTPException
+from sqlmodel import Session, select
+
+from app.api.endpoints import router
+from app.database import create_db_and_tables, engine, async_engine, get_session
+from app.models import Application, Profile, User
+from app.services.auth import AuthTokens
+
+
+def legacy_user(session: Session = Depends(get_session), x_user_email: str = Header(None)):
+    user = session.exec(select(User).where(User.email == x_user_email)).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+def build_app() -> FastAPI:
+    """
+    The current API plus the previous sync handlers under /legacy. Benchmarks add
+    their own /legacy routes to the returned app.
+    """
+    app = FastAPI()
+    app.include_router(router)
+
+    @app.get("/legacy/applications")
+    def legacy_applications(user: User = Depends(legacy_user), session: Session = Depends(get_session)):
+        return session.exec(select(Application).where(Application.user_id == user.id)).all()
+
+    @app.get("/legacy/profile")
+    def legacy_profile(user: User = Depends(legacy_user), session: Session = Depends(get_session)):
+        return session.exec(select(Profile).where(Profile.user_id == user.id)).first()
+
+    return app
+
+
+def seed_user(hashed_password: Optional[str] = None, profile: bool = True) -> User:
+    """
+    Creates the tables if needed and a user with a fresh email (and a profile).
+    """
+    create_db_and_tables()
+    email = f"bench-{uuid4().hex[:8]}@example.com"
+    with Session(engine) as session:
+        user = User(email=email, hashed_password=hashed_password)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        if profile:
+            session.add(Profile(user_id=user.id, first_name="Bench", last_name="User", email=email, phone="", location="Remote"))
+            session.commit()
+            session.refresh(user)
+        session.expunge(user)
+    return user
+
+
+def legacy_headers(user: User) -> dict:
+    return {"X-User-Email": user.email}
+
+
+def token_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {AuthTokens.issue(user)}"}
+
+
+@asynccontextmanager
+async def bench_client(app: FastAPI, **kwargs) -> AsyncIterator[httpx.AsyncClient]:
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", **kwargs) as client:
+            yield client
+    finally:
+        await async_engine.dispose()
@@ -1,13 +1,30 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import router as api_router
-from app.database import create_db_and_tables
+from app.database import create_db_and_tables, async_engine
+from app.agent.llm_factory import warm_up_llms, close_llm_clients
+from app.services.agent_runs import AgentRunService
+from app.services.browser_pool import BrowserPool
+from app.services.blob_store import BlobStore
+from app.services.passwords import PasswordHasher
+from app.services.resume_parser import ResumeService
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    BlobStore.migrate_resume_files()
+    await warm_up_llms()
+    await BrowserPool.start()
+    PasswordHasher.start()
+    await AgentRunService.start()
     yield
+    await AgentRunService.stop()
+    await BrowserPool.stop()
+    PasswordHasher.stop()
+    ResumeService.stop()
+    await close_llm_clients()
+    await async_engine.dispose()
 
 app = FastAPI(title="Job Hunter API", lifespan=lifespan)
 
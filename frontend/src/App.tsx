@@ -6,6 +6,7 @@ import type { JobPreferencesHandle } from './components/JobPreferences';
 import { AgentControls } from './components/AgentControls';
 import { AgentDashboard } from './components/AgentDashboard';
 import { Login } from './components/Login';
+import { getAuthHeaders } from './api/client';
 
 function App() {
   const [refreshHistory, setRefreshHistory] = useState(0);
@@ -21,7 +22,7 @@ function App() {
     if (email) {
       setLoading(true);
       fetch('http://localhost:8000/user/status', {
-        headers: { 'X-User-Email': email }
+        headers: getAuthHeaders()
       })
         .then(res => res.json())
         .then(data => {
@@ -49,6 +50,7 @@ function App() {
 
   const handleLogout = () => {
     localStorage.removeItem('user_email');
+    localStorage.removeItem('auth_token');
     setUser(null);
   };
 
@@ -1,10 +1,17 @@
 const API_URL = 'http://localhost:8000';
 
 export function getAuthHeaders(): Record<string, string> {
+    const token = localStorage.getItem('auth_token');
+    if (token) return { 'Authorization': `Bearer ${token}` };
     const email = localStorage.getItem('user_email');
     return email ? { 'X-User-Email': email } : {};
 }
 
+function storeSession(data: any) {
+    localStorage.setItem('user_email', data.user.email);
+    if (data.token) localStorage.setItem('auth_token', data.token);
+}
+
 export async function login(email: string, password: string) {
     const response = await fetch(`${API_URL}/auth/login`, {
         method: 'POST',
@@ -20,7 +27,7 @@ export async function login(email: string, password: string) {
     }
 
     const data = await response.json();
-    localStorage.setItem('user_email', data.user.email);
+    storeSession(data);
     return data;
 }
 
@@ -39,7 +46,7 @@ export async function register(email: string, password: string, profile: any) {
     }
 
     const data = await response.json();
-    localStorage.setItem('user_email', data.user.email);
+    storeSession(data);
     return data;
 }
 
@@ -53,11 +60,12 @@ export async function socialLogin(email: string, provider: string, first_name: s
     });
 
     if (!response.ok) {
-        throw new Error('Social login failed');
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.detail || 'Social login failed');
     }
 
     const data = await response.json();
-    localStorage.setItem('user_email', data.user.email);
+    storeSession(data);
     return data;
 }
 
@@ -14,8 +14,41 @@ interface AgentControlsProps {
 export const AgentControls: React.FC<AgentControlsProps> = ({ onComplete, resumeRef, prefsRef, isLoggedIn, onAuthRequired }) => {
     const [isRunning, setIsRunning] = useState(false);
     const [status, setStatus] = useState<string>('');
+    const [progress, setProgress] = useState<string>('');
     const [autoApply, setAutoApply] = useState(false);
 
+    // Reads the run's server-sent events, showing each log line as it arrives.
+    // Resolves with the final status event.
+    const followRun = async (runId: string): Promise<any> => {
+        const response = await fetch(`http://localhost:8000/agent/runs/${runId}/events`, {
+            headers: getAuthHeaders()
+        });
+        if (!response.ok || !response.body) throw new Error('Failed to follow agent run');
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let final: any = { status: 'failed' };
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const messages = buffer.split('\n\n');
+            buffer = messages.pop() || '';
+            for (const message of messages) {
+                const dataLine = message.split('\n').find(line => line.startsWith('data: '));
+                if (!dataLine) continue;
+                const event = JSON.parse(dataLine.slice(6));
+                if (event.type === 'log') {
+                    setProgress(event.message);
+                } else if (event.status === 'completed' || event.status === 'failed') {
+                    final = event;
+                }
+            }
+        }
+        return final;
+    };
+
     const startAgent = async () => {
         // Check if user is logged in
         if (!isLoggedIn) {
@@ -26,6 +59,7 @@ export const AgentControls: React.FC<AgentControlsProps> = ({ onComplete, resume
 
         setIsRunning(true);
         setStatus('');
+        setProgress('');
 
         try {
             // 0. Validate Resume Presence
@@ -52,27 +86,34 @@ export const AgentControls: React.FC<AgentControlsProps> = ({ onComplete, resume
                 return;
             }
 
-            // 3. Run the Agent
+            // 3. Queue the Agent run, then follow its progress
             const response = await fetch(`http://localhost:8000/agent/run?auto_apply=${autoApply}`, {
                 method: 'POST',
                 headers: getAuthHeaders()
             });
             const data = await response.json();
-            if (response.ok) {
+            if (!response.ok) {
+                setStatus(`Error: ${data.detail || 'Failed to run agent'}`);
+                return;
+            }
+
+            const run = await followRun(data.run_id);
+            if (run.status === 'completed') {
                 const prefix = wasFileSelected ? "Resume uploaded! " : "";
                 const msg = autoApply
-                    ? `Successfully auto-filled ${data.applications_count} jobs!`
-                    : `Discovered and analyzed ${data.applications_count} jobs! Check history below.`;
+                    ? `Successfully auto-filled ${run.applications_count} jobs!`
+                    : `Discovered and analyzed ${run.applications_count} jobs! Check history below.`;
                 setStatus(`${prefix}${msg}`);
                 onComplete();
             } else {
-                setStatus(`Error: ${data.detail || 'Failed to run agent'}`);
+                setStatus(`Error: ${run.error || 'Agent run failed'}`);
             }
         } catch (error) {
             console.error('Error running agent:', error);
             setStatus('Failed to connect to backend.');
         } finally {
             setIsRunning(false);
+            setProgress('');
         }
     };
 
@@ -130,6 +171,12 @@ export const AgentControls: React.FC<AgentControlsProps> = ({ onComplete, resume
                 </div>
             </div>
 
+            {isRunning && progress && (
+                <div className="mt-6 p-4 rounded-xl text-sm font-medium text-indigo-700 bg-white/60 border border-indigo-100">
+                    {progress}
+                </div>
+            )}
+
             {status && (
                 <div className={`mt-6 p-4 rounded-xl text-sm font-bold flex items-center gap-3 animate-in fade-in slide-in-from-top-2 duration-300 ${status.startsWith('Error') || status.includes('sign in') ? 'bg-red-50 text-red-600 border border-red-100' : 'bg-emerald-50 text-emerald-700 border border-emerald-100'}`}>
                     {status.startsWith('Error') || status.includes('sign in') ? '⚠️' : '✅'}
@@ -18,6 +18,7 @@ export const AgentDashboard: React.FC = () => {
     const [loading, setLoading] = useState(true);
     const [viewAll, setViewAll] = useState(false);
     const [expandedId, setExpandedId] = useState<number | null>(null);
+    const [generatingId, setGeneratingId] = useState<number | null>(null);
 
     const fetchApplications = async () => {
         try {
@@ -39,6 +40,39 @@ export const AgentDashboard: React.FC = () => {
         fetchApplications();
     }, []);
 
+    // Cover letters are only written for auto-applied jobs, generate the rest on first view
+    const toggleLetter = async (app: Application) => {
+        if (expandedId === app.id) {
+            setExpandedId(null);
+            return;
+        }
+        setExpandedId(app.id);
+        if (app.cover_letter || generatingId !== null) return;
+
+        setGeneratingId(app.id);
+        try {
+            const response = await fetch(`http://localhost:8000/applications/${app.id}/cover-letter`, {
+                method: 'POST',
+                headers: getAuthHeaders()
+            });
+            if (!response.ok || !response.body) throw new Error('Failed to generate cover letter');
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let letter = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                letter += decoder.decode(value, { stream: true });
+                setApplications(prev => prev.map(a => a.id === app.id ? { ...a, cover_letter: letter } : a));
+            }
+        } catch (error) {
+            console.error('Error generating cover letter:', error);
+        } finally {
+            setGeneratingId(null);
+        }
+    };
+
     const copyToClipboard = (text: string) => {
         navigator.clipboard.writeText(text);
         alert('Cover letter copied to clipboard!');
@@ -116,18 +150,16 @@ export const AgentDashboard: React.FC = () => {
                                                 >
                                                     Apply
                                                 </a>
-                                                {app.cover_letter && (
-                                                    <button
-                                                        onClick={() => setExpandedId(expandedId === app.id ? null : app.id)}
-                                                        className="text-slate-600 hover:text-slate-900"
-                                                    >
-                                                        {expandedId === app.id ? 'Hide Letter' : 'View Letter'}
-                                                    </button>
-                                                )}
+                                                <button
+                                                    onClick={() => toggleLetter(app)}
+                                                    className="text-slate-600 hover:text-slate-900"
+                                                >
+                                                    {expandedId === app.id ? 'Hide Letter' : app.cover_letter ? 'View Letter' : 'Write Letter'}
+                                                </button>
                                             </div>
                                         </td>
                                     </tr>
-                                    {expandedId === app.id && app.cover_letter && (
+                                    {expandedId === app.id && (app.cover_letter || generatingId === app.id) && (
                                         <tr>
                                             <td colSpan={4} className="px-6 py-4 bg-slate-50">
                                                 <div className="space-y-4">
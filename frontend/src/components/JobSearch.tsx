@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { searchJobs } from '../api/client';
+import { searchJobs, getAuthHeaders } from '../api/client';
 
 interface Job {
     id: string;
@@ -51,12 +51,11 @@ export function JobSearch() {
         setJobs(prev => prev.map(j => j.id === jobId ? { ...j, analyzing: true } : j));
 
         try {
-            const email = localStorage.getItem('user_email');
             const response = await fetch('http://localhost:8000/agent/analyze-single', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'X-User-Email': email || ''
+                    ...getAuthHeaders()
                 },
                 body: JSON.stringify(job)
             });
@@ -59,8 +59,8 @@ export const Login: React.FC<LoginProps> = ({ onLoginSuccess, onClose, initialMo
             const mockEmail = provider === 'google' ? 'google_user@gmail.com' : 'github_user@github.com';
             const data = await socialLogin(mockEmail, provider, 'Social', 'User');
             onLoginSuccess(data.user);
-        } catch (err) {
-            setError('Social login failed');
+        } catch (err: any) {
+            setError(err.message || 'Social login failed');
         } finally {
             setLoading(false);
         }